@@ -1,17 +1,59 @@
 #!/usr/bin/env python3
 
 import os
-import sys
+import re
+import asyncio
+import argparse
 import time
 import json
 import logging
-import requests
+import multiprocessing
+import queue
+import signal
+import socket
+import struct
+import aiohttp
+import numpy as np
+import orjson
 import psutil
-import subprocess
 from datetime import datetime
-from collections import defaultdict, deque
+from collections import defaultdict
 import threading
 
+try:
+    import ovs.db.idl
+    OVS_IDL_AVAILABLE = True
+except ImportError:
+    OVS_IDL_AVAILABLE = False
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    from prometheus_client import Gauge, start_http_server
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Stand-in decorator so JIT targets run as plain NumPy"""
+        return lambda func: func
+
 # Set up logging
 os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
@@ -21,148 +63,632 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Live metrics for Prometheus to scrape instead of re-reading report files
+if PROMETHEUS_AVAILABLE:
+    NET_LATENCY_MS = Gauge('sdn_monitor_latency_ms', 'Latest probed host latency in milliseconds')
+    NET_THROUGHPUT_BYTES = Gauge('sdn_monitor_avg_throughput_bytes', 'Average port byte counter per switch')
+    NET_PACKET_LOSS = Gauge('sdn_monitor_avg_packet_loss', 'Average dropped packets per switch')
+    ACTIVE_SWITCHES = Gauge('sdn_monitor_active_switches', 'Switches reporting port statistics')
+    CPU_PERCENT = Gauge('sdn_monitor_cpu_percent', 'Host CPU utilisation')
+    MEMORY_PERCENT = Gauge('sdn_monitor_memory_percent', 'Host memory utilisation')
+
+# OVSDB Interface.statistics keys mapped onto the names ovs-ofctl dump-ports uses
+OVSDB_STAT_KEYS = {
+    'rx_packets': 'rx_pkts',
+    'rx_bytes': 'rx_bytes',
+    'rx_dropped': 'rx_drop',
+    'rx_errors': 'rx_errs',
+    'rx_frame_err': 'rx_frame',
+    'rx_over_err': 'rx_over',
+    'rx_crc_err': 'rx_crc',
+    'tx_packets': 'tx_pkts',
+    'tx_bytes': 'tx_bytes',
+    'tx_dropped': 'tx_drop',
+    'tx_errors': 'tx_errs',
+    'collisions': 'tx_coll'
+}
+OFPP_LOCAL = 65534
+
+# Port counters kept in struct-of-arrays form for the metrics reducer
+COUNTER_FIELDS = ('rx_bytes', 'tx_bytes', 'rx_drop', 'tx_drop')
+
+# Fallback bridge discovery is refreshed at this interval; bridges rarely change
+BRIDGE_REFRESH_INTERVAL = 10.0
+
+# OpenFlow 1.3 stats over each bridge's management socket (the one ovs-ofctl itself connects to),
+# so port and flow stats come back from one persistent connection in one round trip
+OVS_RUNDIR = '/var/run/openvswitch'
+OFP_VERSION = 0x04
+OFP_HEADER = struct.Struct('!BBHI')  # version, type, length, xid
+OFPT_HELLO = 0
+OFPT_ERROR = 1
+OFPT_ECHO_REQUEST = 2
+OFPT_ECHO_REPLY = 3
+OFPT_MULTIPART_REQUEST = 18
+OFPT_MULTIPART_REPLY = 19
+OFPMP_FLOW = 1
+OFPMP_PORT_STATS = 4
+OFPMPF_MORE = 1
+OFPP_MAX = 0xffffff00  # Higher port numbers are reserved (LOCAL, CONTROLLER, ...)
+OFP_MULTIPART_HEADER = struct.Struct('!HH4x')  # type, flags
+OFP_STATS_REQUEST_BODIES = {
+    # Every port
+    OFPMP_PORT_STATS: struct.pack('!I4x', 0xffffffff),
+    # Every table, port and group, any cookie, empty OXM match
+    OFPMP_FLOW: struct.pack('!B3xII4xQQHH4x', 0xff, 0xffffffff, 0xffffffff, 0, 0, 1, 4),
+}
+OFP_PORT_STATS = struct.Struct('!I4x12Q8x')  # port_no, 12 counters, duration
+OFP_PORT_STATS_FIELDS = ('rx_pkts', 'tx_pkts', 'rx_bytes', 'tx_bytes', 'rx_drop', 'tx_drop',
+                         'rx_errs', 'tx_errs', 'rx_frame', 'rx_over', 'rx_crc', 'tx_coll')
+OFP_FLOW_STATS = struct.Struct('!HBx8xH6x4x8xQQ')  # length, table_id, priority, packet_count, byte_count
+OPENFLOW_STATS_TIMEOUT = 2.0
+
+# ovs-ofctl dump-ports entry; the tx counters may sit on the following line
+PORT_STATS_RE = re.compile(r'port\s+(\d+):\s+rx\s+([^\n]*?)\s+tx\s+([^\n]*)')
+PORT_COUNTER_RE = re.compile(r'(\w+)=(\d+)')
+
+# One network state sample, stored as a record in the metrics ring buffer
+NETWORK_STATE_DTYPE = np.dtype([
+    ('timestamp', 'f8'),
+    ('avg_throughput', 'f4'),
+    ('avg_packet_loss', 'f4'),
+    ('num_active_switches', 'u2'),
+    ('total_switches', 'u2')
+])
+
+# Typed schema for encoding saved network state samples without building dicts
+if MSGSPEC_AVAILABLE:
+    class NetworkState(msgspec.Struct):
+        """One network state sample, mirroring NETWORK_STATE_DTYPE"""
+        timestamp: float
+        avg_throughput: float
+        avg_packet_loss: float
+        num_active_switches: int
+        total_switches: int
+    
+    NETWORK_STATE_ENCODER = msgspec.json.Encoder()
+
+# Non-string keys cover the integer port numbers in switch_stats
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# ICMP echo types; on unprivileged datagram sockets the kernel sets the id and checksum
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PAYLOAD = b'rl-sdn-monitor'
+
+# fping -C summary line, e.g. "10.0.0.2 : 0.42" ("-" for a lost probe)
+PING_LATENCY_RE = re.compile(r'^(\S+)\s*:\s*([\d.]+)', re.MULTILINE)
+
+@njit(cache=True)
+def reduce_port_counters(rx_bytes, tx_bytes, rx_drop, tx_drop):
+    """Sum byte and drop counters across all bridges and ports"""
+    return rx_bytes.sum() + tx_bytes.sum(), rx_drop.sum() + tx_drop.sum()
+
+def _tick_tag():
+    """Return the current time and its file-name tag, computed once per save cycle"""
+    now = time.time()
+    return now, time.strftime('%Y%m%d_%H%M%S', time.localtime(now))
+
+def write_json_atomic(path, data):
+    """Write data as JSON via a temp file so readers never see a partial file"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(data, option=JSON_OPTIONS))
+    os.replace(tmp_path, path)
+
+class SampleRing:
+    """Fixed-size NumPy ring buffer for metric samples (float32 unless given a record dtype)"""
+    
+    def __init__(self, maxlen, dtype=np.float32):
+        self.maxlen = maxlen
+        self.buffer = np.empty(maxlen, dtype=dtype)
+        self.head = 0
+        self.count = 0
+    
+    def append(self, value):
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % self.maxlen
+        if self.count < self.maxlen:
+            self.count += 1
+    
+    def __len__(self):
+        return self.count
+    
+    def view(self):
+        """Return the stored samples as a contiguous array (unordered once wrapped)"""
+        return self.buffer[:self.count]
+    
+    def ordered(self):
+        """Return the stored samples oldest first"""
+        if self.count < self.maxlen:
+            return self.buffer[:self.count]
+        return np.concatenate((self.buffer[self.head:], self.buffer[:self.head]))
+    
+    def latest(self):
+        """Return the most recently appended sample"""
+        return self.buffer[self.head - 1]
+
+class OpenFlowStatsClient:
+    """Persistent OpenFlow 1.3 connection to one bridge's management socket"""
+    
+    def __init__(self, bridge_name):
+        self.path = os.path.join(OVS_RUNDIR, f'{bridge_name}.mgmt')
+        self.reader = None
+        self.writer = None
+        self.xid = 0
+    
+    async def connect(self):
+        """Open the socket and exchange HELLOs, requiring OpenFlow 1.3 or later on the switch side"""
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.writer.write(OFP_HEADER.pack(OFP_VERSION, OFPT_HELLO, OFP_HEADER.size, 0))
+        version, msg_type, _, _ = await self._read_message()
+        if msg_type != OFPT_HELLO or version < OFP_VERSION:
+            raise ConnectionError(f"{self.path} does not speak OpenFlow 1.3")
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    async def _read_message(self):
+        """Read one message, returning (version, type, xid, body)"""
+        version, msg_type, length, xid = OFP_HEADER.unpack(await self.reader.readexactly(OFP_HEADER.size))
+        body = await self.reader.readexactly(length - OFP_HEADER.size)
+        return version, msg_type, xid, body
+    
+    async def request(self, kinds):
+        """Send one multipart request per kind in a single write; returns {kind: concatenated reply bodies}"""
+        pending = {}
+        messages = []
+        for kind in kinds:
+            self.xid = (self.xid + 1) & 0xffffffff
+            body = OFP_MULTIPART_HEADER.pack(kind, 0) + OFP_STATS_REQUEST_BODIES[kind]
+            messages.append(OFP_HEADER.pack(OFP_VERSION, OFPT_MULTIPART_REQUEST, OFP_HEADER.size + len(body), self.xid) + body)
+            pending[self.xid] = kind
+        self.writer.write(b''.join(messages))
+        await self.writer.drain()
+        
+        replies = {kind: [] for kind in kinds}
+        while pending:
+            _, msg_type, xid, body = await self._read_message()
+            if msg_type == OFPT_ECHO_REQUEST:
+                self.writer.write(OFP_HEADER.pack(OFP_VERSION, OFPT_ECHO_REPLY, OFP_HEADER.size + len(body), xid) + body)
+            elif msg_type == OFPT_ERROR and xid in pending:
+                raise ConnectionError(f"Switch rejected stats request {pending[xid]}")
+            elif msg_type == OFPT_MULTIPART_REPLY and xid in pending:
+                _, flags = OFP_MULTIPART_HEADER.unpack_from(body)
+                replies[pending[xid]].append(body[OFP_MULTIPART_HEADER.size:])
+                if not flags & OFPMPF_MORE:
+                    del pending[xid]
+        return {kind: b''.join(parts) for kind, parts in replies.items()}
+
+def parse_port_stats_reply(body):
+    """Port stats reply body -> {port number: counters}, keyed like ovs-ofctl dump-ports"""
+    port_stats = {}
+    for offset in range(0, len(body) - OFP_PORT_STATS.size + 1, OFP_PORT_STATS.size):
+        port_no, *counters = OFP_PORT_STATS.unpack_from(body, offset)
+        if port_no <= OFPP_MAX:
+            port_stats[port_no] = dict(zip(OFP_PORT_STATS_FIELDS, counters))
+    return port_stats
+
+def parse_flow_stats_reply(body, timestamp):
+    """Flow stats reply body -> list of flow entries with their packet and byte counts"""
+    flows = []
+    offset = 0
+    while offset + OFP_FLOW_STATS.size <= len(body):
+        length, table_id, priority, n_packets, n_bytes = OFP_FLOW_STATS.unpack_from(body, offset)
+        if length == 0:
+            break
+        flows.append({'table_id': table_id, 'priority': priority, 'timestamp': timestamp,
+                      'n_packets': n_packets, 'n_bytes': n_bytes})
+        offset += length
+    return flows
+
 class NetworkMonitor:
     """Network monitoring and statistics collection"""
     
-    def __init__(self, poll_interval=0.1, save_interval=5):
+    def __init__(self, poll_interval=0.1, save_interval=5, report_interval=60, metrics_port=9100,
+                 affinity_cores=None):
         self.poll_interval = poll_interval  # 100ms polling
         self.save_interval = save_interval  # Save stats every 5 seconds
+        self.report_interval = report_interval  # JSON performance report every 60 seconds
+        self.metrics_port = metrics_port  # Prometheus scrape endpoint
+        self.affinity_cores = affinity_cores  # CPUs the monitor threads are pinned to (None = unpinned)
         
         # Data storage
         self.switch_stats = defaultdict(lambda: defaultdict(dict))
         self.flow_stats = defaultdict(list)
-        self.network_metrics = deque(maxlen=1000)  # Last 1000 measurements
+        self.network_metrics = SampleRing(1000, dtype=NETWORK_STATE_DTYPE)  # Last 1000 measurements
+        
+        # Hot port counters indexed by [bridge slot, port column], grown on demand; slots of
+        # deleted bridges are zeroed and reused, and each bridge maps its ports to dense columns
+        self.bridge_slots = {}
+        self.free_bridge_slots = []
+        self.port_columns = {}  # bridge name -> {port number: column}
+        self.port_counters = {field: np.zeros((64, 64), dtype=np.uint64) for field in COUNTER_FIELDS}
+        
+        # Compile the reducer up front rather than on the first metrics tick
+        reduce_port_counters(*(counters[:1] for counters in self.port_counters.values()))
         
         # Configuration
         self.ryu_controller_url = 'http://127.0.0.1:8080'
         self.rl_agent_url = 'http://127.0.0.1:5000'
+        self.ovsdb_remote = 'unix:/var/run/openvswitch/db.sock'
+        self.ovsdb_schema = '/usr/share/openvswitch/vswitch.ovsschema'
+        
+        # Persistent OVSDB connection (None falls back to ovs-ofctl polling)
+        self._idl = self._connect_ovsdb()
+        self._idl_seqno = None  # Replica change sequence number at the last read
+        
+        # Cached bridge names and when they were last listed
+        self.ovs_bridges = []
+        self._of_clients = {}  # bridge name -> OpenFlowStatsClient
+        self._flows_dumped_at = {}  # bridge name -> when ovs-ofctl dump-flows last ran for it
+        self.bridges_refreshed_at = 0.0
+        
+        # In-process ICMP prober (None falls back to fping)
+        self._icmp_sock = self._open_icmp_socket()
+        self._icmp_seq = 0
+        
+        # procfs files kept open and re-read with pread for CPU and memory usage
+        self._stat_fd = os.open('/proc/stat', os.O_RDONLY)
+        self._meminfo_fd = os.open('/proc/meminfo', os.O_RDONLY)
+        self._cpu_times = None  # (busy, total) jiffies at the previous read
+        
+        # Timestamp of the last statistics snapshot, for delta logging
+        self.last_saved_ts = 0.0
+        self.last_report_ts = 0.0
+        self.latest_report = None
+        self.metrics_server_started = False
         
         # Running state
         self.running = False
-        self.threads = []
+        self._stop = threading.Event()
+        self._loop = None
+        self._loop_stop = None  # asyncio mirror of _stop, woken from stop_monitoring
+        self.loop_thread = None
+        self.http_session = None  # Shared keep-alive HTTP client, owned by the event loop
         
         # Performance metrics
         self.performance_metrics = {
-            'latency_samples': deque(maxlen=100),
-            'throughput_samples': deque(maxlen=100),
-            'packet_loss_samples': deque(maxlen=100),
-            'jitter_samples': deque(maxlen=100)
+            'latency_samples': SampleRing(100),
+            'throughput_samples': SampleRing(100),
+            'packet_loss_samples': SampleRing(100),
+            'jitter_samples': SampleRing(100)
         }
         
+        # Immutable summary published by the event loop for other threads to read
+        self.published_summary = self._build_summary()
+        
         logger.info("Network monitor initialized")
     
     def start_monitoring(self):
-        """Start all monitoring threads"""
+        """Start all monitors on a background event loop"""
         if self.running:
             logger.warning("Monitoring already running")
             return
         
         self.running = True
+        self._stop.clear()
+        self._start_metrics_server()
+        self._pin_to_cores()
         
-        # Start monitoring threads
-        self.threads = [
-            threading.Thread(target=self._monitor_ovs_switches, daemon=True),
-            threading.Thread(target=self._monitor_system_resources, daemon=True),
-            threading.Thread(target=self._collect_network_metrics, daemon=True),
-            threading.Thread(target=self._save_periodic_data, daemon=True),
-            threading.Thread(target=self._monitor_connectivity, daemon=True)
-        ]
+        # One thread hosts the event loop that multiplexes every monitor
+        self.loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
+        self.loop_thread.start()
         
-        for thread in self.threads:
-            thread.start()
+        logger.info("Started all monitors")
+    
+    def _pin_to_cores(self):
+        """Pin the calling thread, and every thread it starts afterwards, to the configured CPUs"""
+        if not self.affinity_cores:
+            return
+        
+        try:
+            # Keeps the shared stats structures in one core cluster's caches
+            os.sched_setaffinity(0, self.affinity_cores)
+            logger.info(f"Pinned monitor threads to CPUs {sorted(self.affinity_cores)}")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set CPU affinity {sorted(self.affinity_cores)}: {e}")
+    
+    def _start_metrics_server(self):
+        """Expose the Prometheus gauges over HTTP, once per process"""
+        if not PROMETHEUS_AVAILABLE or self.metrics_server_started:
+            return
+        
+        try:
+            start_http_server(self.metrics_port)
+            self.metrics_server_started = True
+            logger.info(f"Serving Prometheus metrics on port {self.metrics_port}")
+        except OSError as e:
+            logger.warning(f"Could not start Prometheus metrics server: {e}")
+    
+    def _run_event_loop(self):
+        """Run every monitor coroutine on a single event loop"""
+        if UVLOOP_AVAILABLE:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         
-        logger.info("Started all monitoring threads")
+        try:
+            asyncio.run(self._run_monitors())
+        except Exception as e:
+            logger.error(f"Monitor event loop stopped: {e}")
+    
+    async def _run_monitors(self):
+        """Run all monitors concurrently until monitoring stops"""
+        # Keep connections to the RL agent and controller open across reports
+        connector = aiohttp.TCPConnector(limit=4)
+        timeout = aiohttp.ClientTimeout(total=2)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            self.http_session = session
+            self._loop_stop = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            if self._stop.is_set():
+                self._loop_stop.set()
+            try:
+                await asyncio.gather(
+                    self._monitor_ovs_switches(),
+                    self._monitor_system_resources(),
+                    self._collect_network_metrics(),
+                    self._save_periodic_data(),
+                    self._monitor_connectivity()
+                )
+            finally:
+                for client in self._of_clients.values():
+                    client.close()
+                self._of_clients.clear()
+                self._loop = None
+                self.http_session = None
+    
+    async def _run_command(self, args, timeout):
+        """Run a command without blocking the event loop, returning (returncode, stdout, stderr)"""
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        return proc.returncode, stdout.decode(), stderr.decode()
     
     def stop_monitoring(self):
-        """Stop all monitoring"""
+        """Stop all monitoring, waking every monitor out of its wait immediately"""
         self.running = False
+        self._stop.set()
+        
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._loop_stop.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self.loop_thread is not None:
+            self.loop_thread.join(timeout=5)
+        
+        for fd in (self._stat_fd, self._meminfo_fd):
+            if fd is not None:
+                os.close(fd)
+        self._stat_fd = self._meminfo_fd = None
         logger.info("Stopped monitoring")
     
-    def _monitor_ovs_switches(self):
-        """Monitor OVS switches using ovs-ofctl commands"""
-        while self.running:
+    async def _wait(self, delay):
+        """Sleep for delay seconds, returning early once monitoring is stopped"""
+        try:
+            await asyncio.wait_for(self._loop_stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _connect_ovsdb(self):
+        """Open a persistent OVSDB IDL connection for bridge and interface stats"""
+        if not OVS_IDL_AVAILABLE or not os.path.exists(self.ovsdb_schema):
+            logger.info("OVSDB IDL not available, falling back to ovs-ofctl polling")
+            return None
+        
+        try:
+            helper = ovs.db.idl.SchemaHelper(location=self.ovsdb_schema)
+            helper.register_columns('Bridge', ['name', 'ports'])
+            helper.register_columns('Port', ['name', 'interfaces'])
+            helper.register_columns('Interface', ['name', 'ofport', 'statistics'])
+            idl = ovs.db.idl.Idl(self.ovsdb_remote, helper)
+            logger.info(f"Connected to OVSDB at {self.ovsdb_remote}")
+            return idl
+        except Exception as e:
+            logger.warning(f"Could not open OVSDB connection, falling back to ovs-ofctl: {e}")
+            return None
+    
+    async def _monitor_ovs_switches(self):
+        """Monitor OVS switches via OVSDB, or ovs-ofctl commands as a fallback"""
+        while not self._stop.is_set():
             try:
-                # Get list of bridges
-                result = subprocess.run(['ovs-vsctl', 'list-br'], 
-                                      capture_output=True, text=True, timeout=5)
-                
-                if result.returncode == 0:
-                    bridges = result.stdout.strip().split('\n')
-                    bridges = [b for b in bridges if b.strip()]
+                if self._idl is not None:
+                    await self._collect_ovsdb_stats()
+                else:
+                    # Re-list bridges only occasionally
+                    if time.time() - self.bridges_refreshed_at >= BRIDGE_REFRESH_INTERVAL:
+                        returncode, stdout, _ = await self._run_command(['ovs-vsctl', 'list-br'], timeout=5)
+                        
+                        if returncode == 0:
+                            self.ovs_bridges = [b for b in stdout.strip().split('\n') if b.strip()]
+                            self.bridges_refreshed_at = time.time()
+                            self._retire_bridges()
                     
-                    for bridge in bridges:
-                        self._collect_bridge_stats(bridge)
+                    # Query all bridges concurrently
+                    await asyncio.gather(*(self._collect_bridge_stats(bridge) for bridge in self.ovs_bridges))
                 
             except Exception as e:
                 logger.debug(f"Error monitoring OVS switches: {e}")
             
-            time.sleep(self.poll_interval)
+            await self._wait(self.poll_interval)
+    
+    async def _collect_ovsdb_stats(self):
+        """Collect port statistics for every bridge from the OVSDB replica"""
+        self._idl.run()
+        if not self._idl.has_ever_connected():
+            return
+        
+        # Bridges and port counters only need re-reading when the replica changed
+        if self._idl.change_seqno != self._idl_seqno:
+            self._idl_seqno = self._idl.change_seqno
+            self._read_ovsdb_bridges()
+        
+        # OVSDB does not carry flow tables; they come over the bridges' OpenFlow connections instead
+        await asyncio.gather(*(self._collect_ovsdb_flow_stats(bridge) for bridge in self.ovs_bridges))
+    
+    async def _collect_ovsdb_flow_stats(self, bridge_name):
+        """Collect flow statistics to go with the OVSDB port counters, without forking when possible"""
+        replies = await self._openflow_stats(bridge_name, (OFPMP_FLOW,))
+        if replies is not None:
+            self.flow_stats[bridge_name] = parse_flow_stats_reply(replies[OFPMP_FLOW], time.time())
+        else:
+            await self._collect_flow_stats(bridge_name)
+    
+    def _read_ovsdb_bridges(self):
+        """Refresh the bridge list and per-port counters from the OVSDB replica"""
+        current_time = time.time()
+        bridges = list(self._idl.tables['Bridge'].rows.values())
+        self.ovs_bridges = [bridge.name for bridge in bridges]
+        self.bridges_refreshed_at = current_time
+        self._retire_bridges()
+        
+        for bridge in bridges:
+            port_stats = {}
+            for port in bridge.ports:
+                for iface in port.interfaces:
+                    # ofport is an optional column, exposed as a 0/1 element list
+                    ofport = iface.ofport[0] if iface.ofport else None
+                    if ofport is None or ofport < 0 or ofport == OFPP_LOCAL:
+                        continue
+                    port_stats[ofport] = {
+                        OVSDB_STAT_KEYS[key]: value
+                        for key, value in iface.statistics.items()
+                        if key in OVSDB_STAT_KEYS
+                    }
+            
+            self.switch_stats[bridge.name]['ports'] = port_stats
+            self.switch_stats[bridge.name]['timestamp'] = current_time
+            self._store_port_counters(bridge.name, port_stats)
     
-    def _collect_bridge_stats(self, bridge_name):
-        """Collect statistics for a specific bridge"""
+    async def _openflow_stats(self, bridge_name, kinds):
+        """Fetch stats over the bridge's persistent OpenFlow connection, or None if it is unavailable"""
+        client = self._of_clients.get(bridge_name)
         try:
-            # Get port statistics
-            result = subprocess.run(['ovs-ofctl', 'dump-ports', bridge_name],
-                                  capture_output=True, text=True, timeout=2)
+            if client is None:
+                client = OpenFlowStatsClient(bridge_name)
+                await asyncio.wait_for(client.connect(), OPENFLOW_STATS_TIMEOUT)
+                self._of_clients[bridge_name] = client
+            return await asyncio.wait_for(client.request(kinds), OPENFLOW_STATS_TIMEOUT)
+        except Exception as e:
+            # A half-read reply leaves the stream unusable; reconnect on the next tick
+            logger.debug(f"OpenFlow stats unavailable for bridge {bridge_name}: {e}")
+            client.close()
+            self._of_clients.pop(bridge_name, None)
+            return None
+    
+    async def _collect_bridge_stats(self, bridge_name):
+        """Collect port and flow statistics for a specific bridge"""
+        replies = await self._openflow_stats(bridge_name, (OFPMP_PORT_STATS, OFPMP_FLOW))
+        if replies is None:
+            # No management socket; separate ovs-ofctl runs, each with its own timeout
+            await asyncio.gather(self._collect_port_stats(bridge_name), self._collect_flow_stats(bridge_name))
+            return
+        
+        current_time = time.time()
+        stats = parse_port_stats_reply(replies[OFPMP_PORT_STATS])
+        self.switch_stats[bridge_name]['ports'] = stats
+        self.switch_stats[bridge_name]['timestamp'] = current_time
+        self._store_port_counters(bridge_name, stats)
+        self.flow_stats[bridge_name] = parse_flow_stats_reply(replies[OFPMP_FLOW], current_time)
+    
+    async def _collect_port_stats(self, bridge_name):
+        """Collect port statistics for a specific bridge"""
+        try:
+            returncode, stdout, _ = await self._run_command(['ovs-ofctl', 'dump-ports', bridge_name], timeout=2)
             
-            if result.returncode == 0:
-                stats = self._parse_port_stats(result.stdout)
+            if returncode == 0:
+                stats = self._parse_port_stats(stdout)
                 self.switch_stats[bridge_name]['ports'] = stats
                 self.switch_stats[bridge_name]['timestamp'] = time.time()
+                self._store_port_counters(bridge_name, stats)
+                
+        except Exception as e:
+            logger.debug(f"Error collecting port stats for bridge {bridge_name}: {e}")
+    
+    async def _collect_flow_stats(self, bridge_name):
+        """Collect flow statistics for a specific bridge with ovs-ofctl, at most once per save interval"""
+        # Flows are only read when statistics are saved or reported, so there is no point forking every tick
+        current_time = time.time()
+        if current_time - self._flows_dumped_at.get(bridge_name, 0.0) < self.save_interval:
+            return
+        self._flows_dumped_at[bridge_name] = current_time
+        try:
+            returncode, stdout, _ = await self._run_command(['ovs-ofctl', 'dump-flows', bridge_name], timeout=2)
             
-            # Get flow statistics
-            result = subprocess.run(['ovs-ofctl', 'dump-flows', bridge_name],
-                                  capture_output=True, text=True, timeout=2)
-            
-            if result.returncode == 0:
-                flows = self._parse_flow_stats(result.stdout)
+            if returncode == 0:
+                flows = self._parse_flow_stats(stdout)
                 self.flow_stats[bridge_name] = flows
                 
         except Exception as e:
-            logger.debug(f"Error collecting stats for bridge {bridge_name}: {e}")
+            logger.debug(f"Error collecting flow stats for bridge {bridge_name}: {e}")
+    
+    def _store_port_counters(self, bridge_name, port_stats):
+        """Copy a bridge's hot port counters into the struct-of-arrays store"""
+        slot = self.bridge_slots.get(bridge_name)
+        if slot is None:
+            slot = self.free_bridge_slots.pop() if self.free_bridge_slots else len(self.bridge_slots)
+            self.bridge_slots[bridge_name] = slot
+        columns = self.port_columns.setdefault(bridge_name, {})
+        for port_num in port_stats:
+            if port_num not in columns:
+                columns[port_num] = len(columns)
+        self._ensure_counter_capacity(slot + 1, len(columns))
+        
+        for field, counters in self.port_counters.items():
+            row = counters[slot]
+            row.fill(0)
+            for port_num, stats in port_stats.items():
+                row[columns[port_num]] = stats.get(field, 0)
+    
+    def _retire_bridges(self):
+        """Forget bridges that are no longer listed, zeroing their counter rows for reuse"""
+        current = set(self.ovs_bridges)
+        for bridge_name in [name for name in self.bridge_slots if name not in current]:
+            slot = self.bridge_slots.pop(bridge_name)
+            for counters in self.port_counters.values():
+                counters[slot].fill(0)
+            self.free_bridge_slots.append(slot)
+            self.port_columns.pop(bridge_name, None)
+            self.switch_stats.pop(bridge_name, None)
+            self.flow_stats.pop(bridge_name, None)
+            self._flows_dumped_at.pop(bridge_name, None)
+        for bridge_name in [name for name in self._of_clients if name not in current]:
+            self._of_clients.pop(bridge_name).close()
+    
+    def _ensure_counter_capacity(self, bridges, ports):
+        """Grow the counter arrays (by doubling) to hold the given bridges and ports"""
+        rows, cols = self.port_counters['rx_bytes'].shape
+        if bridges <= rows and ports <= cols:
+            return
+        
+        while rows < bridges:
+            rows *= 2
+        while cols < ports:
+            cols *= 2
+        for field, counters in self.port_counters.items():
+            grown = np.zeros((rows, cols), dtype=np.uint64)
+            grown[:counters.shape[0], :counters.shape[1]] = counters
+            self.port_counters[field] = grown
     
     def _parse_port_stats(self, output):
         """Parse ovs-ofctl dump-ports output"""
+        # Example entry: "port  1: rx pkts=123, bytes=456, drop=0, errs=0, frame=0, over=0, crc=0
+        #                         tx pkts=123, bytes=456, drop=0, errs=0, coll=0"
         port_stats = {}
         
-        for line in output.split('\n'):
-            if 'port' in line and 'rx' in line:
-                try:
-                    # Example line: "port  1: rx pkts=123, bytes=456, drop=0, errs=0, frame=0, over=0, crc=0"
-                    parts = line.split(':')
-                    if len(parts) >= 2:
-                        port_num = int(parts[0].split()[-1])
-                        stats_part = parts[1]
-                        
-                        # Parse rx stats
-                        rx_stats = {}
-                        if 'rx' in stats_part:
-                            rx_part = stats_part.split('tx')[0]  # Get rx part only
-                            for stat in rx_part.split(','):
-                                if '=' in stat:
-                                    key, value = stat.strip().split('=')
-                                    try:
-                                        rx_stats[f'rx_{key}'] = int(value)
-                                    except ValueError:
-                                        continue
-                        
-                        # Parse tx stats
-                        tx_stats = {}
-                        if 'tx' in stats_part:
-                            tx_part = stats_part.split('tx')[1]  # Get tx part only
-                            for stat in tx_part.split(','):
-                                if '=' in stat:
-                                    key, value = stat.strip().split('=')
-                                    try:
-                                        tx_stats[f'tx_{key}'] = int(value)
-                                    except ValueError:
-                                        continue
-                        
-                        port_stats[port_num] = {**rx_stats, **tx_stats}
-                        
-                except (ValueError, IndexError) as e:
-                    logger.debug(f"Error parsing port stats line: {line}, error: {e}")
-                    continue
+        for match in PORT_STATS_RE.finditer(output):
+            stats = {f'rx_{key}': int(value) for key, value in PORT_COUNTER_RE.findall(match.group(2))}
+            stats.update((f'tx_{key}', int(value)) for key, value in PORT_COUNTER_RE.findall(match.group(3)))
+            port_stats[int(match.group(1))] = stats
         
         return port_stats
     
@@ -209,13 +735,13 @@ class NetworkMonitor:
         
         return flows
     
-    def _monitor_system_resources(self):
+    async def _monitor_system_resources(self):
         """Monitor system resources (CPU, memory, etc.)"""
-        while self.running:
+        while not self._stop.is_set():
             try:
                 # Get system metrics
-                cpu_percent = psutil.cpu_percent(interval=None)
-                memory = psutil.virtual_memory()
+                cpu_percent = self._read_cpu_percent()
+                memory_percent, memory_used = self._read_memory()
                 disk = psutil.disk_usage('/')
                 
                 # Get network interface stats
@@ -224,8 +750,8 @@ class NetworkMonitor:
                 system_stats = {
                     'timestamp': time.time(),
                     'cpu_percent': cpu_percent,
-                    'memory_percent': memory.percent,
-                    'memory_used_gb': memory.used / (1024**3),
+                    'memory_percent': memory_percent,
+                    'memory_used_gb': memory_used / (1024**3),
                     'disk_percent': disk.percent,
                     'network_bytes_sent': net_io.bytes_sent,
                     'network_bytes_recv': net_io.bytes_recv,
@@ -235,44 +761,61 @@ class NetworkMonitor:
                 
                 self.switch_stats['system'] = system_stats
                 
+                if PROMETHEUS_AVAILABLE:
+                    CPU_PERCENT.set(cpu_percent)
+                    MEMORY_PERCENT.set(memory_percent)
+                
             except Exception as e:
                 logger.debug(f"Error monitoring system resources: {e}")
             
-            time.sleep(1.0)  # System monitoring every 1 second
+            await self._wait(1.0)  # System monitoring every 1 second
+    
+    def _read_cpu_percent(self):
+        """CPU utilisation since the previous call, from the aggregate /proc/stat line"""
+        # cpu  user nice system idle iowait irq softirq steal guest guest_nice
+        # Only the first line is needed, so a fixed read is enough even when per-CPU lines overflow it
+        line = os.pread(self._stat_fd, 4096, 0).split(b'\n', 1)[0]
+        times = [int(value) for value in line.split()[1:9]]  # guest time is already in user/nice
+        total = sum(times)
+        busy = total - times[3] - times[4]
+        
+        previous = self._cpu_times
+        self._cpu_times = (busy, total)
+        if previous is None or total == previous[1]:
+            return 0.0
+        return 100.0 * (busy - previous[0]) / (total - previous[1])
+    
+    def _read_memory(self):
+        """Return (percent used, bytes used) from /proc/meminfo, counting reclaimable memory as free"""
+        mem_total = mem_available = None
+        for line in os.pread(self._meminfo_fd, 4096, 0).split(b'\n'):
+            if line.startswith(b'MemTotal:'):
+                mem_total = int(line.split()[1]) * 1024
+            elif line.startswith(b'MemAvailable:'):
+                mem_available = int(line.split()[1]) * 1024
+                break
+        
+        if mem_total is None or mem_available is None:
+            # Older kernels lack MemAvailable; let psutil estimate it
+            memory = psutil.virtual_memory()
+            return memory.percent, memory.total - memory.available
+        used = mem_total - mem_available
+        return 100.0 * used / mem_total, used
     
-    def _collect_network_metrics(self):
+    async def _collect_network_metrics(self):
         """Collect network performance metrics"""
-        while self.running:
+        while not self._stop.is_set():
             try:
-                # Calculate network metrics from switch stats
-                total_throughput = 0
-                total_packet_loss = 0
-                active_switches = 0
-                
                 current_time = time.time()
                 
-                for bridge, stats in self.switch_stats.items():
-                    if bridge == 'system':
-                        continue
-                        
-                    if 'ports' in stats and 'timestamp' in stats:
-                        # Calculate throughput and loss for this switch
-                        bridge_throughput = 0
-                        bridge_loss = 0
-                        
-                        for port_num, port_stats in stats['ports'].items():
-                            if isinstance(port_stats, dict):
-                                rx_bytes = port_stats.get('rx_bytes', 0)
-                                tx_bytes = port_stats.get('tx_bytes', 0)
-                                rx_dropped = port_stats.get('rx_drop', 0)
-                                tx_dropped = port_stats.get('tx_drop', 0)
-                                
-                                bridge_throughput += rx_bytes + tx_bytes
-                                bridge_loss += rx_dropped + tx_dropped
-                        
-                        total_throughput += bridge_throughput
-                        total_packet_loss += bridge_loss
-                        active_switches += 1
+                # Reduce the port counters of every reporting bridge at once; freed slots are zeroed
+                active_switches = len(self.bridge_slots)
+                used_slots = active_switches + len(self.free_bridge_slots)
+                total_throughput, total_packet_loss = reduce_port_counters(
+                    *(self.port_counters[field][:used_slots] for field in COUNTER_FIELDS)
+                )
+                total_throughput = int(total_throughput)
+                total_packet_loss = int(total_packet_loss)
                 
                 # Calculate averages
                 if active_switches > 0:
@@ -282,29 +825,42 @@ class NetworkMonitor:
                     avg_throughput = 0
                     avg_packet_loss = 0
                 
-                # Create network state vector for RL agent
-                network_state = {
-                    'timestamp': current_time,
-                    'avg_throughput': avg_throughput,
-                    'avg_packet_loss': avg_packet_loss,
-                    'num_active_switches': active_switches,
-                    'total_switches': len([b for b in self.switch_stats.keys() if b != 'system'])
-                }
-                
-                self.network_metrics.append(network_state)
+                # Record network state vector for RL agent (fields follow NETWORK_STATE_DTYPE)
+                self.network_metrics.append(
+                    (current_time, avg_throughput, avg_packet_loss, active_switches, len(self.ovs_bridges))
+                )
                 
                 # Update performance metrics
                 self.performance_metrics['throughput_samples'].append(avg_throughput)
                 self.performance_metrics['packet_loss_samples'].append(avg_packet_loss)
                 
+                if PROMETHEUS_AVAILABLE:
+                    NET_THROUGHPUT_BYTES.set(avg_throughput)
+                    NET_PACKET_LOSS.set(avg_packet_loss)
+                    ACTIVE_SWITCHES.set(active_switches)
+                
+                # Publish by swapping a single reference; readers never touch live data
+                self.published_summary = self._build_summary()
+                
             except Exception as e:
                 logger.debug(f"Error collecting network metrics: {e}")
             
-            time.sleep(self.poll_interval)
+            await self._wait(self.poll_interval)
     
-    def _monitor_connectivity(self):
-        """Monitor network connectivity using ping"""
-        while self.running:
+    def _open_icmp_socket(self):
+        """Open an unprivileged ICMP datagram socket for in-process pings"""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            sock.setblocking(False)
+            return sock
+        except OSError as e:
+            # Denied unless the monitor's group is inside net.ipv4.ping_group_range
+            logger.info(f"ICMP datagram sockets unavailable, falling back to fping: {e}")
+            return None
+    
+    async def _monitor_connectivity(self):
+        """Monitor network connectivity with one batched ping round per cycle"""
+        while not self._stop.is_set():
             try:
                 # Test connectivity between known hosts
                 test_pairs = [
@@ -312,146 +868,182 @@ class NetworkMonitor:
                     ('10.0.0.1', '10.0.0.3'),
                     ('10.0.0.1', '10.0.0.4')
                 ]
+                targets = [dst_ip for _, dst_ip in test_pairs]
                 
-                for src_ip, dst_ip in test_pairs:
-                    try:
-                        # Use ping to measure latency
-                        result = subprocess.run(
-                            ['ping', '-c', '1', '-W', '1', dst_ip],
-                            capture_output=True, text=True, timeout=3
-                        )
-                        
-                        if result.returncode == 0:
-                            # Parse ping output for latency
-                            latency = self._parse_ping_latency(result.stdout)
-                            if latency:
-                                self.performance_metrics['latency_samples'].append(latency)
-                        
-                    except Exception as e:
-                        logger.debug(f"Ping test {src_ip}->{dst_ip} failed: {e}")
+                if self._icmp_sock is not None:
+                    latencies = await self._probe_icmp(targets)
+                else:
+                    latencies = await self._probe_fping(targets)
+                
+                for latency in latencies:
+                    self.performance_metrics['latency_samples'].append(latency)
+                    if PROMETHEUS_AVAILABLE:
+                        NET_LATENCY_MS.set(latency)
                 
             except Exception as e:
                 logger.debug(f"Error in connectivity monitoring: {e}")
             
-            time.sleep(5.0)  # Connectivity tests every 5 seconds
+            await self._wait(5.0)  # Connectivity tests every 5 seconds
     
-    def _parse_ping_latency(self, ping_output):
-        """Parse latency from ping output"""
-        try:
-            for line in ping_output.split('\n'):
-                if 'time=' in line:
-                    # Extract time value
-                    start = line.find('time=') + 5
-                    end = line.find('ms', start)
-                    if end != -1:
-                        return float(line[start:end])
-        except Exception as e:
-            logger.debug(f"Error parsing ping latency: {e}")
-        return None
+    async def _probe_icmp(self, targets, timeout=1.0):
+        """Send one ICMP echo to every target and return the round-trip times (ms) of replies"""
+        loop = asyncio.get_running_loop()
+        
+        # Replies are matched on sequence number, which the kernel leaves untouched
+        pending = {}
+        for target in targets:
+            seq = self._icmp_seq
+            self._icmp_seq = (self._icmp_seq + 1) & 0xFFFF
+            request = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, 0, seq) + ICMP_PAYLOAD
+            try:
+                self._icmp_sock.sendto(request, (target, 0))
+                pending[seq] = time.perf_counter()
+            except OSError as e:
+                logger.debug(f"Ping to {target} failed: {e}")
+        
+        latencies = []
+        deadline = loop.time() + timeout
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                reply = await asyncio.wait_for(loop.sock_recv(self._icmp_sock, 1024), remaining)
+            except asyncio.TimeoutError:
+                break
+            
+            if len(reply) < 8 or reply[0] != ICMP_ECHO_REPLY:
+                continue
+            sent_at = pending.pop(struct.unpack_from('!H', reply, 6)[0], None)
+            if sent_at is not None:
+                latencies.append((time.perf_counter() - sent_at) * 1000.0)
+        
+        return latencies
     
-    def _save_periodic_data(self):
+    async def _probe_fping(self, targets):
+        """Probe every target with a single fping and return the round-trip times (ms)"""
+        # fping exits non-zero when any host is unreachable, so parse regardless
+        _, _, stderr = await self._run_command(
+            ['fping', '-q', '-C', '1', '-t', '1000', *targets], timeout=3
+        )
+        return [float(match.group(2)) for match in PING_LATENCY_RE.finditer(stderr)]
+    
+    async def _save_periodic_data(self):
         """Periodically save collected data"""
-        while self.running:
+        while not self._stop.is_set():
             try:
-                self._save_statistics()
-                self._save_performance_report()
+                now, tag = _tick_tag()
+                self._save_statistics(now)
+                
+                # Live values are scraped from the gauges; the JSON report is a slower summary
+                if now - self.last_report_ts >= self.report_interval:
+                    await self._save_performance_report(now, tag)
+                    self.last_report_ts = now
             except Exception as e:
                 logger.error(f"Error saving periodic data: {e}")
             
-            time.sleep(self.save_interval)
+            await self._wait(self.save_interval)
     
-    def _save_statistics(self):
-        """Save current statistics to file"""
+    def _save_statistics(self, current_time):
+        """Append the statistics that changed since the last save"""
         try:
             os.makedirs('data/logs', exist_ok=True)
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            since = self.last_saved_ts
             
-            # Save switch statistics
-            stats_file = f'data/logs/switch_stats_{timestamp}.json'
-            with open(stats_file, 'w') as f:
-                # Convert defaultdict to regular dict for JSON serialization
-                stats_data = {
-                    'timestamp': time.time(),
-                    'switch_stats': dict(self.switch_stats),
-                    'flow_stats': dict(self.flow_stats)
-                }
-                json.dump(stats_data, f, indent=2)
+            # Only bridges (and the system entry) updated since the last snapshot
+            changed = {
+                name: stats for name, stats in self.switch_stats.items()
+                if stats.get('timestamp', 0) > since
+            }
+            stats_data = {
+                'timestamp': current_time,
+                'switch_stats': changed,
+                'flow_stats': {name: self.flow_stats[name] for name in changed if name in self.flow_stats}
+            }
             
-            # Save network metrics
-            metrics_file = f'data/logs/network_metrics_{timestamp}.json'
-            with open(metrics_file, 'w') as f:
-                json.dump(list(self.network_metrics), f, indent=2)
+            samples = self.network_metrics.ordered()
+            new_samples = samples[samples['timestamp'] > since].tolist()
+            if MSGSPEC_AVAILABLE:
+                metrics_data = NETWORK_STATE_ENCODER.encode_lines([NetworkState(*values) for values in new_samples])
+            else:
+                metrics_data = b''.join(
+                    orjson.dumps(dict(zip(NETWORK_STATE_DTYPE.names, values))) + b'\n'
+                    for values in new_samples
+                )
             
-            logger.debug(f"Saved statistics to {stats_file} and {metrics_file}")
+            stats_file = 'data/logs/switch_stats.jsonl'
+            with open(stats_file, 'ab') as f:
+                f.write(orjson.dumps(stats_data, option=JSON_OPTIONS) + b'\n')
+            
+            metrics_file = 'data/logs/network_metrics.jsonl'
+            with open(metrics_file, 'ab') as f:
+                f.write(metrics_data)
+            
+            self.last_saved_ts = current_time
+            logger.debug(f"Appended statistics to {stats_file} and {metrics_file}")
             
         except Exception as e:
             logger.error(f"Error saving statistics: {e}")
     
-    def _save_performance_report(self):
+    async def _save_performance_report(self, current_time, timestamp):
         """Generate and save performance report"""
         try:
             # Calculate performance metrics
-            report = self._generate_performance_report()
+            report = await self._generate_performance_report(current_time)
+            self.latest_report = report
             
             # Save to traffic_results.json (main results file)
-            with open('traffic_results.json', 'w') as f:
-                json.dump(report, f, indent=2)
+            write_json_atomic('traffic_results.json', report)
             
             # Also save timestamped version
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             report_file = f'data/reports/performance_report_{timestamp}.json'
             os.makedirs(os.path.dirname(report_file), exist_ok=True)
             
-            with open(report_file, 'w') as f:
-                json.dump(report, f, indent=2)
+            with open(report_file, 'wb') as f:
+                f.write(orjson.dumps(report, option=JSON_OPTIONS))
             
             logger.debug("Generated performance report")
             
         except Exception as e:
             logger.error(f"Error generating performance report: {e}")
     
-    def _generate_performance_report(self):
-        """Generate comprehensive performance report"""
-        import numpy as np
-        
-        current_time = time.time()
-        
+    async def _fetch_json(self, url):
+        """GET a JSON document over the shared session, returning {} on failure"""
+        try:
+            async with self.http_session.get(url) as response:
+                if response.status == 200:
+                    return await response.json()
+        except Exception as e:
+            logger.debug(f"Could not fetch {url}: {e}")
+        return {}
+    
+    async def _generate_performance_report(self, current_time):
+        """Generate comprehensive performance report"""        
         # Calculate statistics for each metric
         def calculate_stats(samples):
             if not samples:
                 return {'avg': 0, 'min': 0, 'max': 0, 'std': 0}
             
+            values = samples.view()
             return {
-                'avg': float(np.mean(samples)),
-                'min': float(np.min(samples)),
-                'max': float(np.max(samples)),
-                'std': float(np.std(samples)),
-                'count': len(samples)
+                'avg': float(values.mean()),
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'std': float(values.std()),
+                'count': values.size
             }
         
-        # Get RL agent statistics
-        rl_stats = {}
-        try:
-            response = requests.get(f'{self.rl_agent_url}/stats', timeout=2)
-            if response.status_code == 200:
-                rl_stats = response.json()
-        except Exception as e:
-            logger.debug(f"Could not fetch RL agent stats: {e}")
-        
-        # Get controller statistics
-        controller_stats = {}
-        try:
-            response = requests.get(f'{self.ryu_controller_url}/rlcontroller/stats', timeout=2)
-            if response.status_code == 200:
-                controller_stats = response.json()
-        except Exception as e:
-            logger.debug(f"Could not fetch controller stats: {e}")
+        # Get RL agent and controller statistics concurrently
+        rl_stats, controller_stats = await asyncio.gather(
+            self._fetch_json(f'{self.rl_agent_url}/stats'),
+            self._fetch_json(f'{self.ryu_controller_url}/rlcontroller/stats')
+        )
         
         # Generate report
         report = {
             'timestamp': current_time,
-            'report_generated': datetime.now().isoformat(),
+            'report_generated': datetime.fromtimestamp(current_time).isoformat(),
             'monitoring_duration_seconds': len(self.network_metrics) * self.poll_interval,
             
             # Network Performance Metrics
@@ -502,19 +1094,19 @@ class NetworkMonitor:
             if not self.network_metrics:
                 return (0.0, 0.0, 0.0, 0.0)
             
-            latest_metrics = self.network_metrics[-1]
+            latest_metrics = self.network_metrics.latest()
             
             # Calculate utilization (normalized)
-            avg_throughput = latest_metrics.get('avg_throughput', 0)
+            avg_throughput = float(latest_metrics['avg_throughput'])
             max_throughput = 1000000000  # 1 Gbps assumption
             utilization = min(avg_throughput / max_throughput, 1.0)
             
             # Calculate packet loss rate (normalized)
-            avg_packet_loss = latest_metrics.get('avg_packet_loss', 0)
+            avg_packet_loss = float(latest_metrics['avg_packet_loss'])
             packet_loss_rate = min(avg_packet_loss / 1000.0, 1.0)  # Normalize to [0,1]
             
             # Network size metric
-            num_switches = latest_metrics.get('num_active_switches', 0)
+            num_switches = int(latest_metrics['num_active_switches'])
             network_size = min(num_switches / 100.0, 1.0)  # Normalize to [0,1]
             
             # Queue length approximation (using packet loss as proxy)
@@ -526,24 +1118,30 @@ class NetworkMonitor:
             logger.error(f"Error getting network state: {e}")
             return (0.0, 0.0, 0.0, 0.0)
     
-    def get_monitoring_summary(self):
-        """Get summary of monitoring data"""
+    def _build_summary(self):
+        """Snapshot the sample counters; only called from the event loop"""
         return {
-            'monitoring_active': self.running,
-            'switches_monitored': len([k for k in self.switch_stats.keys() if k != 'system']),
+            'switches_monitored': len(self.bridge_slots),
             'network_samples': len(self.network_metrics),
             'performance_samples': {
                 'latency': len(self.performance_metrics['latency_samples']),
                 'throughput': len(self.performance_metrics['throughput_samples']),
                 'packet_loss': len(self.performance_metrics['packet_loss_samples'])
             },
-            'latest_network_state': self.get_current_network_state(),
+            'latest_network_state': self.get_current_network_state()
+        }
+    
+    def get_monitoring_summary(self):
+        """Get summary of monitoring data"""
+        return {
+            **self.published_summary,
+            'monitoring_active': self.running,
             'uptime_seconds': time.time() - getattr(self, 'start_time', time.time())
         }
 
 
-def create_monitoring_plots():
-    """Create monitoring visualization plots"""
+def create_monitoring_plots(report=None):
+    """Create monitoring visualization plots, from traffic_results.json unless a report is given"""
     try:
         import matplotlib.pyplot as plt
         import numpy as np
@@ -551,12 +1149,13 @@ def create_monitoring_plots():
         os.makedirs('monitoring_plots', exist_ok=True)
         
         # Load latest data
-        try:
-            with open('traffic_results.json', 'r') as f:
-                report = json.load(f)
-        except FileNotFoundError:
-            logger.warning("No traffic results file found for plotting")
-            return
+        if report is None:
+            try:
+                with open('traffic_results.json', 'r') as f:
+                    report = json.load(f)
+            except FileNotFoundError:
+                logger.warning("No traffic results file found for plotting")
+                return
         
         # Create performance plots
         fig, axes = plt.subplots(2, 2, figsize=(15, 10))
@@ -606,7 +1205,7 @@ def create_monitoring_plots():
             axes[1, 1].set_ylabel('Percentage')
         
         # Save plot
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        _, timestamp = _tick_tag()
         plot_file = f'monitoring_plots/performance_plot_{timestamp}.png'
         plt.tight_layout()
         plt.savefig(plot_file, dpi=300, bbox_inches='tight')
@@ -616,7 +1215,7 @@ def create_monitoring_plots():
         
         # Create RL agent performance plot if data available
         if 'rl_agent_performance' in report and report['rl_agent_performance']:
-            create_rl_performance_plot(report['rl_agent_performance'])
+            create_rl_performance_plot(report['rl_agent_performance'], timestamp)
         
     except ImportError:
         logger.warning("Matplotlib not available, skipping plot generation")
@@ -624,7 +1223,7 @@ def create_monitoring_plots():
         logger.error(f"Error creating monitoring plots: {e}")
 
 
-def create_rl_performance_plot(rl_stats):
+def create_rl_performance_plot(rl_stats, timestamp):
     """Create RL agent specific performance plots"""
     try:
         import matplotlib.pyplot as plt
@@ -670,7 +1269,6 @@ def create_rl_performance_plot(rl_stats):
             axes[2].set_title('Agent Statistics')
         
         # Save plot
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         plot_file = f'monitoring_plots/rl_performance_{timestamp}.png'
         plt.tight_layout()
         plt.savefig(plot_file, dpi=300, bbox_inches='tight')
@@ -682,17 +1280,48 @@ def create_rl_performance_plot(rl_stats):
         logger.error(f"Error creating RL performance plot: {e}")
 
 
-def main():
+def plot_worker(plot_queue):
+    """Render plots for reports received on the queue until None arrives"""
+    # Shutdown is driven by the parent through the queue, not by Ctrl+C on the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+    except ImportError:
+        pass  # create_monitoring_plots logs the missing dependency
+    
+    while True:
+        report = plot_queue.get()
+        if report is None:
+            break
+        create_monitoring_plots(report)
+
+
+def main(report_interval=60, metrics_port=9100, affinity_cores=None):
     """Main function to run network monitoring"""
     try:
         # Initialize monitor
-        monitor = NetworkMonitor(poll_interval=0.1, save_interval=10)
+        monitor = NetworkMonitor(poll_interval=0.1, save_interval=10,
+                                 report_interval=report_interval, metrics_port=metrics_port,
+                                 affinity_cores=affinity_cores)
         monitor.start_time = time.time()
         
         logger.info("Starting network monitoring...")
         print("Starting network monitoring... (Press Ctrl+C to stop)")
         
-        # Start monitoring
+        # Render plots in a separate process, started before any monitor threads exist
+        plot_queue = multiprocessing.Queue(maxsize=2)
+        plot_process = multiprocessing.Process(target=plot_worker, args=(plot_queue,), daemon=True)
+        plot_process.start()
+        
+        # Ctrl+C / SIGTERM wake the main loop immediately instead of interrupting a sleep; installed
+        # after the plot worker forks (so it keeps the default SIGTERM) but before any monitor starts
+        shutdown = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: shutdown.set())
+        
+        # Start monitoring (pins this thread too, but not the plot worker started above)
         monitor.start_monitoring()
         
         # Main loop - generate plots periodically
@@ -700,9 +1329,7 @@ def main():
         plot_interval = 60  # Generate plots every minute
         
         try:
-            while True:
-                time.sleep(5)
-                
+            while not shutdown.wait(5):
                 # Print monitoring summary
                 summary = monitor.get_monitoring_summary()
                 print(f"\rSwitches: {summary['switches_monitored']}, "
@@ -712,17 +1339,28 @@ def main():
                 # Generate plots periodically
                 current_time = time.time()
                 if current_time - last_plot_time >= plot_interval:
-                    create_monitoring_plots()
+                    if monitor.latest_report is not None:
+                        try:
+                            plot_queue.put_nowait(monitor.latest_report)
+                        except queue.Full:
+                            logger.debug("Plot worker still busy, skipping this round")
                     last_plot_time = current_time
-                
-        except KeyboardInterrupt:
+            
             print("\nStopping monitoring...")
             
         finally:
             monitor.stop_monitoring()
             
-            # Generate final plots and report
-            create_monitoring_plots()
+            # Generate final plots and report; a dead or wedged plot worker must not hang shutdown
+            try:
+                if monitor.latest_report is not None:
+                    plot_queue.put(monitor.latest_report, timeout=5)
+                plot_queue.put(None, timeout=5)
+            except queue.Full:
+                logger.warning("Plot worker not accepting work, skipping final plots")
+            plot_process.join(timeout=60)
+            if plot_process.is_alive():
+                plot_process.terminate()
             
             print("Final performance report saved to traffic_results.json")
             print("Monitoring plots saved to monitoring_plots/")
@@ -733,9 +1371,16 @@ def main():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monitor OVS switches and RL-SDN performance')
+    parser.add_argument('--report-interval', type=float, default=60, help='Seconds between JSON performance reports')
+    parser.add_argument('--metrics-port', type=int, default=9100, help='Port for the Prometheus metrics endpoint')
+    parser.add_argument('--affinity-cores', type=lambda value: {int(cpu) for cpu in value.split(',')},
+                        default=None, help='Comma-separated CPUs to pin the monitor threads to, e.g. 0,1')
+    args = parser.parse_args()
+    
     # Create necessary directories
     os.makedirs('data/logs', exist_ok=True)
     os.makedirs('data/reports', exist_ok=True)
     os.makedirs('monitoring_plots', exist_ok=True)
     
-    main()
+    main(args.report_interval, args.metrics_port, args.affinity_cores)
@@ -31,7 +31,11 @@ echo "Training mode - the agent will learn from network interactions"
 echo "Training progress will be logged. Use Ctrl+C to stop gracefully"
 
 mkdir -p data/logs data/models monitoring_plots
-python3 src/rl_agent.py > data/logs/rl_agent.log 2>&1 &
+if command -v gunicorn > /dev/null 2>&1; then
+    gunicorn -k gthread --threads 8 -w 1 -b 0.0.0.0:5000 --pythonpath src wsgi:app > data/logs/rl_agent.log 2>&1 &
+else
+    python3 src/rl_agent.py > data/logs/rl_agent.log 2>&1 &
+fi
 echo $! > pids/rl_agent.pid
 
 echo "Press Ctrl+C to stop"
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 
-import json
 import os
 import time
 import argparse
+import numpy as np
+import orjson
 import requests
+import shutil
 import socket
+import subprocess
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.node import RemoteController
@@ -13,207 +16,192 @@ from mininet.link import TCLink
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
 
-class LinearTopo(Topo):
+class RecordedTopo(Topo):
+    """Base topology that records topology_info.json while nodes and links are added"""
+    def start_topology_info(self):
+        # Direct references so each add_link touches the per-switch port maps without re-walking the dict
+        self._switches = {}
+        self._ports = {}
+        self._hosts = {}
+        self._links = []
+        self._topology_info = {'switches': self._switches, 'hosts': self._hosts, 'links': self._links}
+
+    def add_switch(self, dpid):
+        name = f's{dpid}'
+        ports = {}
+        self._switches[name] = {'dpid': dpid, 'ports': ports}
+        self._ports[name] = ports
+        return self.addSwitch(name, dpid=str(dpid).zfill(16))
+
+    def add_host(self, index):
+        name = f'h{index}'
+        ip = f'10.0.0.{index}'
+        mac = f'00:00:00:00:00:0{index}'
+        self._hosts[name] = {'ip': ip, 'mac': mac, 'connected_to': ''}
+        return self.addHost(name, ip=f'{ip}/24', mac=mac)
+
+    def add_link(self, node1, node2, port1, port2):
+        """Add a link and record the port numbers each switch uses for it"""
+        self.addLink(node1, node2, port1=port1, port2=port2, cls=TCLink, bw=10, delay='1ms', loss=0)
+        host = self._hosts.get(node1)
+        if host is not None:
+            # Host links are reported by the switch-side port
+            host['connected_to'] = node2
+            self._ports[node2][node1] = port2
+            self._links.append({'src': node1, 'dst': node2, 'port': port2})
+        else:
+            self._ports[node1][node2] = port1
+            self._ports[node2][node1] = port2
+            self._links.append({'src': node1, 'dst': node2, 'port': port1})
+
+    def generate_topology_info(self, kind):
+        """Write the recorded topology to topology_info.json"""
+        os.makedirs('data/config', exist_ok=True)
+        with open('data/config/topology_info.json', 'wb') as f:
+            f.write(orjson.dumps(self._topology_info, option=orjson.OPT_INDENT_2))
+        info(f"Generated topology_info.json for {kind} topology\n")
+
+class LinearTopo(RecordedTopo):
     """Linear topology: h1-s1-s2(h2)-s3(h3)-s4-h4"""
     def build(self):
+        self.start_topology_info()
+        
         # Add switches
         switches = []
         for i in range(1, 5):
-            switch = self.addSwitch(f's{i}', dpid=str(i).zfill(16))
+            switch = self.add_switch(i)
             switches.append(switch)
         
         # Add hosts
         hosts = []
         for i in range(1, 5):
-            host = self.addHost(f'h{i}', ip=f'10.0.0.{i}/24', mac=f'00:00:00:00:00:0{i}')
+            host = self.add_host(i)
             hosts.append(host)
         
         # Add host-switch links
-        self.addLink(hosts[0], switches[0], port1=0, port2=1, cls=TCLink, bw=10, delay='1ms', loss=0)
-        self.addLink(hosts[1], switches[1], port1=0, port2=1, cls=TCLink, bw=10, delay='1ms', loss=0)
-        self.addLink(hosts[2], switches[2], port1=0, port2=1, cls=TCLink, bw=10, delay='1ms', loss=0)
-        self.addLink(hosts[3], switches[3], port1=0, port2=1, cls=TCLink, bw=10, delay='1ms', loss=0)
+        for host, switch in zip(hosts, switches):
+            self.add_link(host, switch, 0, 1)
         
         # Add switch-switch links
         for i in range(len(switches)-1):
-            self.addLink(switches[i], switches[i+1], port1=2+i, port2=2, cls=TCLink, bw=10, delay='1ms', loss=0)
+            self.add_link(switches[i], switches[i+1], 2+i, 2)
         
         # Generate topology info
-        self.generate_topology_info(switches, hosts)
+        self.generate_topology_info('linear')
 
-    def generate_topology_info(self, switches, hosts):
-        """Generate topology_info.json for the linear topology"""
-        topology_info = {
-            'switches': {f's{i+1}': {'dpid': i+1, 'ports': {}} for i in range(len(switches))},
-            'hosts': {f'h{i+1}': {'ip': f'10.0.0.{i+1}', 'mac': f'00:00:00:00:00:0{i+1}', 'connected_to': f's{i+1}'} for i in range(len(hosts))},
-            'links': []
-        }
-        
-        # Add host-switch links
-        for i in range(len(hosts)):
-            topology_info['switches'][f's{i+1}']['ports'][f'h{i+1}'] = 1
-            topology_info['links'].append({'src': f'h{i+1}', 'dst': f's{i+1}', 'port': 1})
-        
-        # Add switch-switch links
-        for i in range(len(switches)-1):
-            src_switch = f's{i+1}'
-            dst_switch = f's{i+2}'
-            topology_info['switches'][src_switch]['ports'][dst_switch] = 2+i
-            topology_info['switches'][dst_switch]['ports'][src_switch] = 2
-            topology_info['links'].append({'src': src_switch, 'dst': dst_switch, 'port': 2+i})
-        
-        os.makedirs('data/config', exist_ok=True)
-        with open('data/config/topology_info.json', 'w') as f:
-            json.dump(topology_info, f, indent=2)
-        info("Generated topology_info.json for linear topology\n")
-
-class GridTopo(Topo):
+class GridTopo(RecordedTopo):
     """Grid topology for 200+ nodes (default 15x15 = 225 switches)"""
     def build(self, size=15):
-        switches = []
-        switch_dpid = 1
-        port_counters = {}  # Track port numbers per switch
-        for i in range(size):
-            row = []
-            for j in range(size):
-                switch = self.addSwitch(f's{switch_dpid}', dpid=str(switch_dpid).zfill(16))
-                row.append(switch)
-                port_counters[f's{switch_dpid}'] = 1
-                info(f"Added switch: s{switch_dpid}\n")
-                switch_dpid += 1
-            switches.append(row)
+        self.start_topology_info()
+        
+        # Switch names and next free ports, both indexed by switch id (slot 0 unused)
+        switches = [None]
+        port_counters = np.ones(size * size + 1, dtype=np.int64)
+        for switch_dpid in range(1, size * size + 1):
+            switch = self.add_switch(switch_dpid)
+            switches.append(switch)
+            info(f"Added switch: {switch}\n")
         
         # Add hosts (4 hosts at corners)
         hosts = []
         for i in range(1, 5):
-            host = self.addHost(f'h{i}', ip=f'10.0.0.{i}/24', mac=f'00:00:00:00:00:0{i}')
+            host = self.add_host(i)
             hosts.append(host)
-            info(f"Added host: h{i}\n")
+            info(f"Added host: {host}\n")
         
         # Connect hosts to corner switches
-        corner_switches = [
-            (hosts[0], switches[0][0], 's1'),
-            (hosts[1], switches[0][size-1], f's{size}'),
-            (hosts[2], switches[size-1][0], f's{size*(size-1)+1}'),
-            (hosts[3], switches[size-1][size-1], f's{size*size}')
-        ]
-        for host, switch, switch_name in corner_switches:
-            port = port_counters[switch_name]
-            self.addLink(host, switch, port1=0, port2=port, cls=TCLink, bw=10, delay='1ms', loss=0)
-            info(f"Added link: {host.name} (port 0) <-> {switch_name} (port {port})\n")
-            port_counters[switch_name] += 1
+        corner_switches = [1, size, size*(size-1)+1, size*size]
+        for host, switch_id in zip(hosts, corner_switches):
+            switch = switches[switch_id]
+            port = int(port_counters[switch_id])
+            self.add_link(host, switch, 0, port)
+            info(f"Added link: {host} (port 0) <-> {switch} (port {port})\n")
+            port_counters[switch_id] += 1
+        
+        # Grid edges as (switch id, switch id) pairs: each switch's right neighbour, then the one below,
+        # in row-major order so port numbers match the order links are added
+        ids = np.arange(1, size * size + 1).reshape(size, size)
+        horizontal = np.stack([ids[:, :-1], ids[:, 1:]], axis=-1).reshape(-1, 2)
+        vertical = np.stack([ids[:-1, :], ids[1:, :]], axis=-1).reshape(-1, 2)
+        edges = np.concatenate([horizontal, vertical])
+        order = np.argsort(edges[:, 0] * 2 + (np.arange(len(edges)) >= len(horizontal)), kind='stable')
+        edges = edges[order]
+        
+        # A switch's port for an edge is its first free port plus how many earlier edges it is on
+        endpoints = edges.ravel()
+        by_switch = np.argsort(endpoints, kind='stable')
+        counts = np.bincount(endpoints, minlength=size * size + 1)
+        first = np.cumsum(counts) - counts
+        rank = np.empty_like(endpoints)
+        rank[by_switch] = np.arange(len(endpoints)) - first[endpoints[by_switch]]
+        ports = (port_counters[endpoints] + rank).reshape(-1, 2)
         
         # Add grid links
-        for i in range(size):
-            for j in range(size):
-                current_switch = switches[i][j]
-                current_switch_name = f's{i * size + j + 1}'
-                if j < size-1:
-                    next_switch = switches[i][j+1]
-                    next_switch_name = f's{i * size + j + 2}'
-                    port1 = port_counters[current_switch_name]
-                    port2 = port_counters[next_switch_name]
-                    self.addLink(current_switch, next_switch, port1=port1, port2=port2, cls=TCLink, bw=10, delay='1ms', loss=0)
-                    info(f"Added link: {current_switch_name} (port {port1}) <-> {next_switch_name} (port {port2})\n")
-                    port_counters[current_switch_name] += 1
-                    port_counters[next_switch_name] += 1
-                if i < size-1:
-                    next_switch = switches[i+1][j]
-                    next_switch_name = f's{(i + 1) * size + j + 1}'
-                    port1 = port_counters[current_switch_name]
-                    port2 = port_counters[next_switch_name]
-                    self.addLink(current_switch, next_switch, port1=port1, port2=port2, cls=TCLink, bw=10, delay='1ms', loss=0)
-                    info(f"Added link: {current_switch_name} (port {port1}) <-> {next_switch_name} (port {port2})\n")
-                    port_counters[current_switch_name] += 1
-                    port_counters[next_switch_name] += 1
+        for (src_id, dst_id), (port1, port2) in zip(edges.tolist(), ports.tolist()):
+            current_switch = switches[src_id]
+            next_switch = switches[dst_id]
+            self.add_link(current_switch, next_switch, port1, port2)
+            info(f"Added link: {current_switch} (port {port1}) <-> {next_switch} (port {port2})\n")
         
         # Generate topology info
-        self.generate_topology_info(switches, hosts, size)
+        self.generate_topology_info('grid')
 
-    def generate_topology_info(self, switches, hosts, size):
-        """Generate topology_info.json for the grid topology"""
-        topology_info = {
-            'switches': {f's{i+1}': {'dpid': i+1, 'ports': {}} for i in range(size * size)},
-            'hosts': {f'h{i+1}': {'ip': f'10.0.0.{i+1}', 'mac': f'00:00:00:00:00:0{i+1}', 'connected_to': ''} for i in range(len(hosts))},
-            'links': []
-        }
-        
-        port_counters = {f's{i+1}': 1 for i in range(size * size)}
-        corner_switches = {
-            'h1': 's1',
-            'h2': f's{size}',
-            'h3': f's{size*(size-1)+1}',
-            'h4': f's{size*size}'
-        }
-        for host, switch in corner_switches.items():
-            topology_info['hosts'][host]['connected_to'] = switch
-            topology_info['switches'][switch]['ports'][host] = port_counters[switch]
-            topology_info['links'].append({'src': host, 'dst': switch, 'port': port_counters[switch]})
-            port_counters[switch] += 1
-        
-        for i in range(size):
-            for j in range(size):
-                switch_id = i * size + j + 1
-                current_switch = f's{switch_id}'
-                if j < size-1:
-                    next_switch = f's{i * size + j + 2}'
-                    topology_info['switches'][current_switch]['ports'][next_switch] = port_counters[current_switch]
-                    topology_info['switches'][next_switch]['ports'][current_switch] = port_counters[next_switch]
-                    topology_info['links'].append({'src': current_switch, 'dst': next_switch, 'port': port_counters[current_switch]})
-                    port_counters[current_switch] += 1
-                    port_counters[next_switch] += 1
-                if i < size-1:
-                    next_switch = f's{(i + 1) * size + j + 1}'
-                    topology_info['switches'][current_switch]['ports'][next_switch] = port_counters[current_switch]
-                    topology_info['switches'][next_switch]['ports'][current_switch] = port_counters[next_switch]
-                    topology_info['links'].append({'src': current_switch, 'dst': next_switch, 'port': port_counters[current_switch]})
-                    port_counters[current_switch] += 1
-                    port_counters[next_switch] += 1
-        
-        os.makedirs('data/config', exist_ok=True)
-        with open('data/config/topology_info.json', 'w') as f:
-            json.dump(topology_info, f, indent=2)
-        info("Generated topology_info.json for grid topology\n")
+CONTROLLER_CHECK_TTL = 5.0  # Seconds a reachability result is reused
+_controller_checks = {}  # (ip, port) -> (checked_at, reachable)
 
 def check_controller_connection(ip='127.0.0.1', port=6653, timeout=5):
-    """Check if controller is reachable"""
+    """Check if controller is reachable, reusing a result from the last few seconds"""
+    cached = _controller_checks.get((ip, port))
+    if cached is not None and time.time() - cached[0] < CONTROLLER_CHECK_TTL:
+        return cached[1]
+    
     try:
         with socket.create_connection((ip, port), timeout):
             info(f"Controller at {ip}:{port} is reachable\n")
-            return True
+            reachable = True
     except Exception as e:
         info(f"Failed to connect to controller at {ip}:{port}: {e}\n")
-        return False
+        reachable = False
+    _controller_checks[(ip, port)] = (time.time(), reachable)
+    return reachable
 
 def install_tools(net):
-    """Install iperf and tcpdump on all hosts"""
-    for host in net.hosts:
-        host.cmd('apt-get update && apt-get install -y iperf tcpdump &')
-    max_wait = 60
-    start_time = time.time()
-    while time.time() - start_time < max_wait:
-        all_done = True
-        for host in net.hosts:
-            if host.cmd('ps aux | grep apt-get | grep -v grep') != '':
-                all_done = False
-                break
-        if all_done:
-            break
-        time.sleep(2)
-    info("Tool installation completed\n")
+    """Install iperf and tcpdump for the hosts"""
+    if shutil.which('iperf') and shutil.which('tcpdump'):
+        info("iperf and tcpdump already installed\n")
+        return
+    
+    if not net.hosts:
+        info("No hosts to install tools on\n")
+        return
+    
+    # Mininet hosts share the root filesystem, so one install (one dpkg lock) covers them all;
+    # apt output is discarded so it cannot fill a pipe and stall the install
+    proc = net.hosts[0].popen('apt-get update && apt-get install -y iperf tcpdump', shell=True,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    try:
+        returncode = proc.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        info("Tool installation still running after 60 seconds, continuing\n")
+        return
+    if returncode == 0:
+        info("Tool installation completed\n")
+    else:
+        info(f"Tool installation failed with exit code {returncode}\n")
 
 def trigger_initial_flows(net):
-    """Proactively trigger flow installation for all host pairs with retries"""
+    """Proactively trigger flow installation for all host pairs in one batch, with retries"""
     hosts = net.hosts
     max_retries = 5
     retry_delay = 3
     controller_ready = False
+    session = requests.Session()  # Keep-alive connection for the readiness checks and the batch
     
     # Check controller readiness
     start_time = time.time()
     while time.time() - start_time < 30:
         try:
-            response = requests.get('http://127.0.0.1:8080/stats', timeout=2.0)
+            response = session.get('http://127.0.0.1:8080/stats', timeout=2.0)
             response.raise_for_status()
             controller_ready = True
             info("Controller is ready\n")
@@ -226,32 +214,39 @@ def trigger_initial_flows(net):
         info("Controller not ready after 30 seconds\n")
         return
     
-    for i, src_host in enumerate(hosts):
-        for j, dst_host in enumerate(hosts):
-            if i != j:
-                src_ip = src_host.IP()
-                dst_ip = dst_host.IP()
-                for attempt in range(max_retries):
-                    try:
-                        payload = {
-                            'src_ip': src_ip,
-                            'dst_ip': dst_ip,
-                            'is_tcp': True
-                        }
-                        response = requests.post(
-                            'http://127.0.0.1:8080/force_path',
-                            json=payload,
-                            timeout=3.0
-                        )
-                        response.raise_for_status()
-                        info(f"Triggered flow installation for {src_ip} -> {dst_ip}\n")
-                        break
-                    except Exception as e:
-                        info(f"Failed to trigger flow for {src_ip} -> {dst_ip} (attempt {attempt+1}/{max_retries}): {e}\n")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay)
-                        else:
-                            info(f"Failed to install flow for {src_ip} -> {dst_ip} after {max_retries} attempts\n")
+    pending = [
+        {'src_ip': src_host.IP(), 'dst_ip': dst_host.IP(), 'is_tcp': True}
+        for src_host in hosts for dst_host in hosts if src_host is not dst_host
+    ]
+    for attempt in range(max_retries):
+        try:
+            response = session.post(
+                'http://127.0.0.1:8080/force_paths_batch',
+                json={'pairs': pending},
+                timeout=3.0 * len(pending)
+            )
+            response.raise_for_status()
+            results = response.json()['results']
+            
+            # Only pairs that failed are retried
+            failed = []
+            for pair, result in zip(pending, results):
+                if result.get('status') == 'success':
+                    info(f"Triggered flow installation for {pair['src_ip']} -> {pair['dst_ip']}\n")
+                else:
+                    failed.append(pair)
+            pending = failed
+            if not pending:
+                break
+            info(f"Failed to trigger {len(pending)} flows (attempt {attempt+1}/{max_retries})\n")
+        except Exception as e:
+            info(f"Failed to trigger flows for {len(pending)} host pairs (attempt {attempt+1}/{max_retries}): {e}\n")
+        
+        if attempt < max_retries - 1:
+            time.sleep(retry_delay * 2 ** attempt)
+    
+    for pair in pending:
+        info(f"Failed to install flow for {pair['src_ip']} -> {pair['dst_ip']} after {max_retries} attempts\n")
 
 def run_topology(topo_type='linear', grid_size=15):
     """Run the specified topology"""
@@ -3,13 +3,18 @@
 import json
 import logging
 import os
+import queue
+import threading
 import numpy as np
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, Response, request, jsonify
 import tensorflow as tf
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(filename='logs/rl_agent.log', level=logging.DEBUG)
+# Configure logging (WARNING keeps per-request logging off the hot path; override with RL_AGENT_LOG_LEVEL)
+logging.basicConfig(filename='logs/rl_agent.log', level=os.environ.get('RL_AGENT_LOG_LEVEL', 'WARNING').upper())
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -39,14 +44,28 @@ class QLearningAgent:
                 logger.error("Possible paths file %s not found", paths_path)
                 raise FileNotFoundError(f"Possible paths file {paths_path} not found")
             
-            with open(paths_path, 'r') as f:
-                self.possible_paths = json.load(f)
+            # possible_paths.json grows quickly with grid size; orjson parses it several times faster
+            with open(paths_path, 'rb') as f:
+                self.possible_paths = orjson.loads(f.read())
             
-            self.q_table = {}
             self.initialize_q_table()
             self.model = self.build_dqn_model()
-            self.recent_rewards = []
+            # Trace inference once; calling the concrete function skips predict()'s per-call setup
+            self._infer = tf.function(lambda x: self.model(x, training=False)).get_concrete_function(
+                tf.TensorSpec([None, self.feature_size], tf.float32))
+            self.recent_rewards = deque(maxlen=100)
             self.total_steps = 0
+            self.lock = threading.Lock()  # Serializes Q-table writes across server threads
+            
+            # /update only enqueues; a learner thread applies updates in batches
+            self.update_queue = queue.Queue(maxsize=10000)
+            self.learn_batch_size = 128
+            self.learner = threading.Thread(target=self._learner_loop, daemon=True)
+            self.learner.start()
+            
+            # Checkpoints are written off the learner thread, one at a time
+            self.saver = ThreadPoolExecutor(max_workers=1)
+            self.save_future = None
             logger.info("Q-Learning agent initialized with state_size=%s, lr=%s, discount=%s, save_interval=%s",
                         self.state_size, self.learning_rate, self.discount_factor, self.save_interval)
             logger.info("Initialized qlearning agent for topology with %s paths", len(self.possible_paths))
@@ -55,21 +74,44 @@ class QLearningAgent:
             raise
 
     def initialize_q_table(self):
+        # One contiguous float32 row per path; path_index maps a path to its row
+        self.path_index = {}
+        # path_slot is a path's position among its src-dst candidates, one-hot encoded into the network input
+        self.path_slot = {}
         for path_key in self.possible_paths:
-            for path in self.possible_paths[path_key]:
-                path_str = str(path)
-                if path_str not in self.q_table:
-                    self.q_table[path_str] = np.zeros(self.state_size)
-                    logger.debug("Initialized Q-table for path %s", path_str)
+            for slot, path in enumerate(self.possible_paths[path_key]):
+                key = tuple(path)
+                if key not in self.path_index:
+                    self.path_index[key] = len(self.path_index)
+                    self.path_slot[key] = slot
+        self.max_paths = max((len(paths) for paths in self.possible_paths.values()), default=1) or 1
+        self.path_features = np.eye(self.max_paths, dtype=np.float32)
+        self.feature_size = self.state_size + self.max_paths
+        self.q_matrix = np.zeros((max(len(self.path_index), 1), self.state_size), dtype=np.float32)
+        logger.info("Initialized Q-table with %s paths", len(self.path_index))
+
+    def path_row(self, key):
+        # Unseen paths (e.g. an action posted to /update) get a fresh zeroed row
+        row = self.path_index.get(key)
+        if row is None:
+            row = len(self.path_index)
+            if row == len(self.q_matrix):
+                # Double the capacity so repeated growth stays amortized O(1)
+                self.q_matrix = np.concatenate([self.q_matrix, np.zeros_like(self.q_matrix)])
+            self.path_index[key] = row
+        return row
+
+    def q_rows(self):
+        return self.q_matrix[:len(self.path_index)]
 
     def build_dqn_model(self):
         model = tf.keras.Sequential([
-            tf.keras.layers.Dense(24, activation='relu', input_shape=(self.state_size,)),
+            tf.keras.layers.Dense(24, activation='relu', input_shape=(self.feature_size,)),
             tf.keras.layers.Dense(24, activation='relu'),
             tf.keras.layers.Dense(1, activation='linear')
         ])
         model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=self.learning_rate), loss='mse')
-        logger.info("DQN model built with input shape (%s,)", self.state_size)
+        logger.info("DQN model built with input shape (%s,)", self.feature_size)
         return model
 
     def get_action(self, state, src, dst):
@@ -83,40 +125,131 @@ class QLearningAgent:
             logger.error("No paths available for %s", path_key)
             return None, None
         
-        state = np.array(state).reshape(1, -1)
-        q_values = []
-        for path in paths:
-            path_str = str(path)
-            if path_str not in self.q_table:
-                self.q_table[path_str] = np.zeros(self.state_size)
-            q_value = self.model.predict(state, verbose=0)[0][0]
-            q_values.append(q_value)
+        # Score every candidate path in one forward pass: the state plus each path's one-hot slot
+        features = np.hstack([np.tile(state, (len(paths), 1)), self.path_features[:len(paths)]])
+        q_values = self._infer(tf.constant(features)).numpy().ravel()
         
-        action_idx = np.argmax(q_values)
+        action_idx = int(np.argmax(q_values))
         chosen_path = paths[action_idx]
-        logger.debug("Selected path %s for state %s, src=%s, dst=%s", chosen_path, state, src, dst)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Selected path %s for state %s, src=%s, dst=%s", chosen_path, state, src, dst)
         return chosen_path, action_idx
 
-    def update_q_table(self, state, action, reward, next_state):
-        action_str = str(action)
-        if action_str not in self.q_table:
-            self.q_table[action_str] = np.zeros(self.state_size)
+    def get_actions(self, state, pairs):
+        # Candidates of every pair share the state, so all of them are scored in one forward pass
+        candidates = [self.possible_paths.get(f"{src}->{dst}") or [] for src, dst in pairs]
+        counts = [len(paths) for paths in candidates]
+        if not sum(counts):
+            return [(None, None)] * len(pairs)
+        
+        slots = np.concatenate([np.arange(count) for count in counts if count])
+        features = np.hstack([np.tile(state, (len(slots), 1)), self.path_features[slots]])
+        q_values = self._infer(tf.constant(features)).numpy().ravel()
+        
+        actions = []
+        start = 0
+        for paths, count in zip(candidates, counts):
+            if not count:
+                actions.append((None, None))
+                continue
+            action_idx = int(np.argmax(q_values[start:start + count]))
+            actions.append((paths[action_idx], action_idx))
+            start += count
+        return actions
+
+    def queue_update(self, state, action, reward, next_state):
+        try:
+            self.update_queue.put_nowait((state, action, reward, next_state))
+            return True
+        except queue.Full:
+            logger.warning("Update queue full, dropping update for action %s", action)
+            return False
+
+    def _learner_loop(self):
+        while True:
+            # Block for one update, then take whatever else is already waiting
+            batch = [self.update_queue.get()]
+            while len(batch) < self.learn_batch_size:
+                try:
+                    batch.append(self.update_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.update_q_table(batch)
+            except Exception as e:
+                logger.error("Error applying %s queued updates: %s", len(batch), e)
+
+    def update_q_table(self, batch):
+        states = np.stack([update[0] for update in batch])
+        rewards = np.array([update[2] for update in batch], dtype=np.float32)
+        next_states = np.stack([update[3] for update in batch])
+        
+        # Actions outside possible_paths have no slot and get an all-zero path encoding
+        action_features = np.zeros((len(batch), self.max_paths), dtype=np.float32)
+        for i, (_, action, _, _) in enumerate(batch):
+            slot = self.path_slot.get(action)
+            if slot is not None:
+                action_features[i, slot] = 1.0
         
-        state = np.array(state)
-        next_state = np.array(next_state)
-        current_q = self.q_table[action_str]
-        next_max_q = max([self.model.predict(np.array([next_state]), verbose=0)[0][0] for path in self.q_table])
+        # One forward pass scores every next_state against every path slot; max over slots
+        next_features = np.hstack([
+            np.repeat(next_states, self.max_paths, axis=0),
+            np.tile(self.path_features, (len(batch), 1))
+        ])
+        next_q = self._infer(tf.constant(next_features)).numpy().reshape(len(batch), self.max_paths)
+        targets = rewards + self.discount_factor * next_q.max(axis=1)
         
-        self.q_table[action_str] = (1 - self.learning_rate) * current_q + self.learning_rate * (reward + self.discount_factor * next_max_q)
-        self.recent_rewards.append(reward)
-        self.total_steps += 1
+        # One gradient step fits the whole batch
+        self.model.train_on_batch(np.hstack([states, action_features]), targets[:, None])
         
-        if self.total_steps % self.save_interval == 0:
-            self.model.save(f'models/dqn_model_{self.total_steps}.h5')
-            logger.info("Saved DQN model at step %s", self.total_steps)
+        with self.lock:
+            for (_, action, reward, _), target in zip(batch, targets):
+                row = self.path_row(action)
+                self.q_matrix[row] = (1 - self.learning_rate) * self.q_matrix[row] + self.learning_rate * target
+                self.recent_rewards.append(reward)
+                self.total_steps += 1
+                
+                if self.total_steps % self.save_interval == 0:
+                    self.save_model()
+
+    def save_model(self):
+        # A checkpoint still waiting to start is superseded by this newer one
+        if self.save_future is not None:
+            self.save_future.cancel()
+        path = f'models/dqn_ckpt_{self.total_steps}'
+        self.save_future = self.saver.submit(self.model.save_weights, path, save_format='tf')
+        self.save_future.add_done_callback(lambda future: self._log_save(future, path))
+
+    def _log_save(self, future, path):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("Failed to save DQN weights to %s: %s", path, future.exception())
+        else:
+            logger.info("Saved DQN weights to %s", path)
 
 agent = None
 
+def to_state_array(state, state_size):
+    """Validate a JSON state and convert it to a float32 vector once, at ingress"""
+    if not isinstance(state, list) or len(state) != state_size:
+        return None
+    try:
+        state_array = np.asarray(state, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    # Nested input such as [[1], [2], [3], [4]] has the right length but the wrong shape
+    return state_array if state_array.ndim == 1 else None
+
+def init_agent():
+    """Create the global agent; shared by the dev server and wsgi.py"""
+    global agent
+    os.makedirs('logs', exist_ok=True)
+    os.makedirs('models', exist_ok=True)
+    agent = QLearningAgent()
+    logger.info("RL agent initialized successfully")
+    return agent
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({
@@ -141,7 +274,8 @@ def get_path():
             logger.error("Missing src or dst in payload: %s", data)
             return jsonify({'error': 'Missing src or dst'}), 400
         
-        if not isinstance(state, list) or len(state) != agent.state_size:
+        state_array = to_state_array(state, agent.state_size)
+        if state_array is None:
             logger.error("Invalid state format or length: %s (expected length %s)", state, agent.state_size)
             return jsonify({'error': f'State must be a list of length {agent.state_size}'}), 400
         
@@ -150,7 +284,7 @@ def get_path():
             logger.error("Invalid src-dst pair: %s", path_key)
             return jsonify({'error': f'Invalid src-dst pair: {path_key}'}), 400
         
-        path, action_idx = agent.get_action(state, src, dst)
+        path, action_idx = agent.get_action(state_array, src, dst)
         if path is None:
             logger.error("No valid path found for %s", path_key)
             return jsonify({'error': 'No valid path found'}), 400
@@ -164,6 +298,36 @@ def get_path():
         logger.error("Error in get_path: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/get_paths', methods=['POST'])
+def get_paths():
+    try:
+        data = request.get_json()
+        if not data:
+            logger.error("No JSON data in request")
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        pairs = data.get('pairs')
+        state = data.get('state')
+        
+        if not isinstance(pairs, list) or not all(isinstance(pair, list) and len(pair) == 2 for pair in pairs):
+            logger.error("Invalid pairs in payload: %s", pairs)
+            return jsonify({'error': 'Pairs must be a list of [src, dst]'}), 400
+        
+        state_array = to_state_array(state, agent.state_size)
+        if state_array is None:
+            logger.error("Invalid state format or length: %s (expected length %s)", state, agent.state_size)
+            return jsonify({'error': f'State must be a list of length {agent.state_size}'}), 400
+        
+        # Pairs without candidates get an empty object, in the same position as the request
+        actions = agent.get_actions(state_array, pairs)
+        logger.info("Returning paths for %s pairs", len(pairs))
+        return jsonify({
+            'paths': [{'path': path, 'action_idx': action_idx} if path is not None else {} for path, action_idx in actions]
+        })
+    except Exception as e:
+        logger.error("Error in get_paths: %s", e)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/update', methods=['POST'])
 def update():
     try:
@@ -177,17 +341,30 @@ def update():
             logger.error("Missing required fields in update payload: %s", data)
             return jsonify({'error': 'Missing required fields'}), 400
         
-        if not isinstance(state, list) or len(state) != agent.state_size:
+        state_array = to_state_array(state, agent.state_size)
+        if state_array is None:
             logger.error("Invalid state format or length: %s", state)
             return jsonify({'error': f'State must be a list of length {agent.state_size}'}), 400
         
-        if not isinstance(next_state, list) or len(next_state) != agent.state_size:
+        next_state_array = to_state_array(next_state, agent.state_size)
+        if next_state_array is None:
             logger.error("Invalid next_state format or length: %s", next_state)
             return jsonify({'error': f'Next_state must be a list of length {agent.state_size}'}), 400
         
-        agent.update_q_table(state, action, reward, next_state)
-        logger.info("Updated Q-table with reward %s", reward)
-        return jsonify({'status': 'success'})
+        if not isinstance(reward, (int, float)):
+            logger.error("Invalid reward: %s", reward)
+            return jsonify({'error': 'Reward must be a number'}), 400
+        
+        if not isinstance(action, list):
+            logger.error("Invalid action: %s", action)
+            return jsonify({'error': 'Action must be a path list'}), 400
+        
+        # Paths are keyed by tuple; convert once at the boundary
+        if not agent.queue_update(state_array, tuple(action), reward, next_state_array):
+            return jsonify({'error': 'Update queue full'}), 503
+        logger.info("Queued Q-table update with reward %s", reward)
+        # Same 200/'success' reply as before queuing, so existing clients keep working
+        return jsonify({'status': 'success', 'queued': True})
     except Exception as e:
         logger.error("Error in update: %s", e)
         return jsonify({'error': str(e)}), 500
@@ -195,21 +372,34 @@ def update():
 @app.route('/stats', methods=['GET'])
 def stats():
     try:
-        return jsonify({
-            'count': agent.total_steps,
-            'recent_rewards': agent.recent_rewards[-100:],
-            'paths': {k: v.tolist() for k, v in agent.q_table.items()}
-        })
+        # Snapshot under the lock; rows are a view of q_matrix, not a copy
+        with agent.lock:
+            header = orjson.dumps({'count': agent.total_steps, 'recent_rewards': list(agent.recent_rewards)})
+            if request.args.get('summary'):
+                # Pollers that only need the counters skip the Q-table
+                return Response(header, mimetype='application/json')
+            paths = list(agent.path_index)
+            rows = agent.q_rows()
+        
+        def generate(chunk_size=1024):
+            # Splice a "paths" object into the header, then emit the Q-table a chunk of rows at a time
+            yield header[:-1] + b',"paths":{'
+            for start in range(0, len(paths), chunk_size):
+                yield b','.join(
+                    orjson.dumps(str(list(path))) + b':' + orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY)
+                    for path, row in zip(paths[start:start + chunk_size], rows[start:start + chunk_size])
+                ) + (b',' if start + chunk_size < len(paths) else b'')
+            yield b'}}'
+        
+        return Response(generate(), mimetype='application/json')
     except Exception as e:
         logger.error("Error in stats: %s", e)
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    os.makedirs('logs', exist_ok=True)
-    os.makedirs('models', exist_ok=True)
+    # Development server; for production run: gunicorn -k gthread --threads 8 -w 1 -b 0.0.0.0:5000 --pythonpath src wsgi:app
     try:
-        agent = QLearningAgent()
-        logger.info("RL agent initialized successfully")
+        init_agent()
         logger.info("Starting RL Agent Flask server on port 5000...")
         app.run(host='0.0.0.0', port=5000, debug=False)
     except Exception as e:
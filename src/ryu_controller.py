@@ -1,24 +1,45 @@
 #!/usr/bin/env python3
 
-import json
 import logging
 import os
 from ryu.base import app_manager
 from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, set_ev_cls
-from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+from ryu.lib import hub
 from ryu.lib.packet import packet, ethernet, arp, ipv4, tcp
 from ryu.app.wsgi import ControllerBase, WSGIApplication, route
 from webob import Response
 import networkx as nx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+import socket
+import struct
 import time
+from collections import OrderedDict
 
-# Configure logging
-logging.basicConfig(filename='logs/ryu_controller.log', level=logging.DEBUG)
+# Configure logging (per-packet DEBUG lines are off by default; override with RYU_CONTROLLER_LOG_LEVEL)
+logging.basicConfig(filename='logs/ryu_controller.log', level=os.environ.get('RYU_CONTROLLER_LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
-REROUTE_TIMEOUT = 2.0
+# Bursts of PacketIns for the same flow reuse RL responses within this window (seconds)
+PATH_CACHE_TTL = 0.2
+STATE_POLL_INTERVAL = 0.5  # Seconds between background fetches of the RL agent's stats summary
+STATE_POLL_MAX_INTERVAL = 5.0  # Polling backs off to this while idle or while the agent is down
+
+ETH_HEADER = struct.Struct('!6s6sH')  # dst MAC, src MAC, ethertype
+ETH_TYPE_ARP = 0x0806
+ETH_TYPE_IPV4 = 0x0800
+ETH_TYPES_VLAN = (0x8100, 0x88a8)  # 802.1Q and 802.1ad tags; only these need the full parser to find IPv4
+IPV4_ADDRS_OFFSET = 14 + 12  # src and dst addresses in an untagged IPv4 frame
+IPV4_ADDRS = struct.Struct('!4s4s')
+FLOW_IDLE_TIMEOUT = 120
+FLOW_HARD_TIMEOUT = 300
+# Installed flows live at least this long; FlowRemoved messages evict entries that go away sooner
+INSTALLED_PATH_TTL = min(FLOW_IDLE_TIMEOUT, FLOW_HARD_TIMEOUT)
+JSON_HEADERS = {'Content-Type': 'application/json'}
+MAC_TABLE_SIZE = 4096  # Learned MACs kept per switch before the oldest is evicted
 
 class SimpleSwitch13(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
@@ -28,16 +49,52 @@ class SimpleSwitch13(app_manager.RyuApp):
         super(SimpleSwitch13, self).__init__(*args, **kwargs)
         self.mac_to_port = {}
         self.topology_graph = nx.Graph()
+        self._n_nodes = 0  # Node/edge counts kept alongside the graph for the density feature
+        self._n_edges = 0
         self.switches = {}
         self.hosts = {}
         self.datapaths = {}
-        self.flow_stats = {'count': 0, 'flows': []}
-        self.existing_flows = {}  # Track installed flows to avoid duplicates
+        self.flow_stats = {'count': 0}  # Per-flow records live in existing_flows and _flows_by_dpid
+        self.existing_flows = {}  # (dpid, priority, match fields) -> output ports of the installed flow
+        self._flows_by_dpid = {}  # dpid -> {(src_ip, dst_ip)} of IP flows installed on that switch
+        self._topology_info = None  # Parsed topology_info.json, loaded once
+        self._topology_loaded = False  # Graph populated from topology_info; later switch connects skip it
+        self.ip_to_dpid = {}  # Host IP -> dpid of the switch it is attached to
+        self._edge_port = {}  # (dpid, neighbor dpid) -> output port on dpid towards the neighbor
+        self._port_neighbor = {}  # (dpid, port) -> neighbor dpid reached through that port
+        self._apsp = {}  # src dpid -> dst dpid -> shortest path, rebuilt when the graph changes
+        self._topo_version = 0
+        self._path_cache = {}  # (src dpid, dst dpid) -> (fetched_at, path_info)
+        self._latest_stats = {'count': 0, 'recent_rewards': []}  # Last stats summary from the RL agent
+        self._state_used_at = 0.0  # Monotonic time the network state was last asked for
+        self._topology_ready = hub.Event()  # Set once the graph has been populated from topology_info
+        self._installed_paths = {}  # (src_ip, dst_ip) -> monotonic expiry of its installed path
+        # Keep-alive connection pool to the RL agent, reused by every PacketIn and reroute
+        self._http = requests.Session()
+        self._http.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0))
         self.wsgi = kwargs['wsgi']
         self.wsgi.register(RLControllerAPI, {'controller': self})
+        self._state_thread = hub.spawn(self._state_poller)
         logger.info("SimpleSwitch13 initialized")
 
-    def add_flow(self, datapath, priority, match, actions, idle_timeout=120, hard_timeout=300):
+    def add_flow(self, datapath, priority, match, actions, idle_timeout=FLOW_IDLE_TIMEOUT, hard_timeout=FLOW_HARD_TIMEOUT):
+        mod = self._flow_mod(datapath, priority, match, actions, idle_timeout, hard_timeout)
+        if mod is not None:
+            datapath.send_msg(mod)
+
+    @staticmethod
+    def _flow_key(dpid, priority, match):
+        return (dpid, priority, match.get('eth_type'), match.get('ipv4_src'), match.get('ipv4_dst'), match.get('ip_proto'))
+
+    def _flow_mod(self, datapath, priority, match, actions, idle_timeout=FLOW_IDLE_TIMEOUT, hard_timeout=FLOW_HARD_TIMEOUT):
+        """Build and record a FlowMod, or return None if the flow is already installed"""
+        # Check for a live flow with the same match and output ports before building any message;
+        # a different output port (a reroute) replaces the entry, since the switch overwrites the flow too
+        flow_key = self._flow_key(datapath.id, priority, match)
+        out_ports = tuple(action.port for action in actions if hasattr(action, 'port'))
+        if self.existing_flows.get(flow_key) == out_ports:
+            logger.debug("Flow already exists: %s -> %s", flow_key, out_ports)
+            return None
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
         inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
@@ -47,48 +104,60 @@ class SimpleSwitch13(app_manager.RyuApp):
             match=match,
             instructions=inst,
             idle_timeout=idle_timeout,
-            hard_timeout=hard_timeout
+            hard_timeout=hard_timeout,
+            # Expiring flows report their removal so the dedupe entry is dropped with them
+            flags=ofproto.OFPFF_SEND_FLOW_REM if idle_timeout or hard_timeout else 0
         )
-        # Check for duplicate flows
-        flow_key = (datapath.id, str(match), str(actions))
-        if flow_key in self.existing_flows:
-            logger.debug(f"Flow already exists for dpid={datapath.id}, match={match}, actions={actions}")
-            return
-        datapath.send_msg(mod)
         self.flow_stats['count'] += 1
-        self.flow_stats['flows'].append({
-            'dpid': datapath.id,
-            'src_ip': match.get('ipv4_src', 'unknown'),
-            'dst_ip': match.get('ipv4_dst', 'unknown'),
-            'actions': [str(action) for action in actions]
-        })
-        self.existing_flows[flow_key] = True
-        logger.info(f"Added flow: dpid={datapath.id}, match={match}, actions={actions}")
+        self.existing_flows[flow_key] = out_ports
+        if flow_key[3] is not None:
+            self._flows_by_dpid.setdefault(datapath.id, set()).add((flow_key[3], flow_key[4]))
+        logger.debug("Added flow: dpid=%s, priority=%s, src_ip=%s, dst_ip=%s, out_ports=%s",
+                    datapath.id, priority, flow_key[3], flow_key[4], out_ports)
+        return mod
+
+    def _load_topology_info(self):
+        """Parse topology_info.json and index host IPs by their switch dpid"""
+        with open('data/config/topology_info.json', 'rb') as f:
+            topology_info = orjson.loads(f.read())
+        self.ip_to_dpid = {
+            info['ip']: topology_info['switches'][info['connected_to']]['dpid']
+            for info in topology_info['hosts'].values()
+        }
+        self._topology_info = topology_info
+        return topology_info
 
     def _get_switch_for_ip(self, ip):
-        try:
-            with open('data/config/topology_info.json', 'r') as f:
-                topology_info = json.load(f)
-            for host, info in topology_info['hosts'].items():
-                if info['ip'] == ip:
-                    switch_name = info['connected_to']
-                    return topology_info['switches'][switch_name]['dpid']
-            logger.warning(f"No switch found for IP {ip}")
-            return None
-        except Exception as e:
-            logger.error(f"Error reading topology_info.json: {e}")
-            return None
+        if self._topology_info is None:
+            # No switch has connected yet; load the file once instead of on every lookup
+            try:
+                self._load_topology_info()
+            except Exception as e:
+                logger.error("Error reading topology_info.json: %s", e)
+                return None
+        dpid = self.ip_to_dpid.get(ip)
+        if dpid is None:
+            logger.warning("No switch found for IP %s", ip)
+        return dpid
+
+    def _rebuild_apsp(self):
+        """Precompute all-pairs shortest paths for the current topology graph"""
+        self._apsp = dict(nx.all_pairs_shortest_path(self.topology_graph))
+        self._topo_version += 1
+        logger.info("Rebuilt shortest paths for topology version %s", self._topo_version)
 
     def _get_shortest_path(self, src_switch, dst_switch):
-        try:
-            path = nx.shortest_path(self.topology_graph, src_switch, dst_switch)
-            logger.info(f"Shortest path from {src_switch} to {dst_switch}: {path}")
-            return path
-        except nx.NetworkXNoPath:
-            logger.warning(f"No path found from {src_switch} to {dst_switch}")
-            return []
+        path = self._apsp.get(src_switch, {}).get(dst_switch, [])
+        if path:
+            logger.debug("Shortest path from %s to %s: %s", src_switch, dst_switch, path)
+        else:
+            logger.warning("No path found from %s to %s", src_switch, dst_switch)
+        return path
 
     def _request_path_from_rl_agent(self, src_switch, dst_switch, network_state):
+        cached = self._path_cache.get((src_switch, dst_switch))
+        if cached is not None and time.monotonic() - cached[0] < PATH_CACHE_TTL:
+            return cached[1]
         try:
             # Convert switch IDs to strings for RL agent compatibility
             payload = {
@@ -96,77 +165,139 @@ class SimpleSwitch13(app_manager.RyuApp):
                 'dst': str(dst_switch),
                 'state': list(network_state)
             }
-            logger.debug(f"Sending payload to RL agent: {payload}")
-            response = requests.post('http://127.0.0.1:5000/get_path', json=payload, timeout=2.0)
+            logger.debug("Sending payload to RL agent: %s", payload)
+            response = self._http.post('http://127.0.0.1:5000/get_path', data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=2.0)
+            response.raise_for_status()
+            path_info = orjson.loads(response.content)
+            logger.debug("RL agent path for %s->%s: %s", src_switch, dst_switch, path_info)
+            self._path_cache[(src_switch, dst_switch)] = (time.monotonic(), path_info)
+            return path_info
+        except Exception as e:
+            logger.error("Error requesting path from RL agent: %s", e)
+            return {}
+
+    def _request_paths_from_rl_agent(self, pairs, network_state):
+        """Ask the RL agent for paths for many (src, dst) switch pairs in one request"""
+        try:
+            payload = {
+                'pairs': [[str(src_switch), str(dst_switch)] for src_switch, dst_switch in pairs],
+                'state': list(network_state)
+            }
+            response = self._http.post('http://127.0.0.1:5000/get_paths', data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=2.0)
             response.raise_for_status()
-            logger.info(f"RL agent path for {src_switch}->{dst_switch}: {response.json()}")
-            return response.json()
+            results = orjson.loads(response.content)['paths']
+            return {pair: result.get('path', []) for pair, result in zip(pairs, results)}
         except Exception as e:
-            logger.error(f"Error requesting path from RL agent: {e}")
+            logger.error("Error requesting paths from RL agent: %s", e)
             return {}
 
     def _install_path_flows(self, path, src_ip, dst_ip, is_tcp=True):
-        for i in range(len(path) - 1):
-            src_dpid = path[i]
-            dst_dpid = path[i + 1]
-            datapath = self.datapaths.get(src_dpid)
-            if not datapath:
-                logger.error(f"No datapath for dpid {src_dpid}")
-                continue
-            ofproto = datapath.ofproto
-            parser = datapath.ofproto_parser
-            try:
-                port = self.topology_graph[src_dpid][dst_dpid]['port']
-            except KeyError:
-                logger.error(f"No port found for edge {src_dpid}->{dst_dpid}")
-                continue
-            match = parser.OFPMatch(
+        # Build both directions first so return traffic never falls back to PacketIn,
+        # then send each switch's FlowMods together
+        pending = {}  # dpid -> (datapath, [mods])
+        output_actions = {}  # port -> [OFPActionOutput], shared by both directions
+        complete = True
+        for hop_path, hop_src, hop_dst in ((path, src_ip, dst_ip), (path[::-1], dst_ip, src_ip)):
+            # Every switch speaks OpenFlow 1.3, so one match serves all hops in this direction
+            match = ofproto_v1_3_parser.OFPMatch(
                 eth_type=0x0800,
-                ipv4_src=src_ip,
-                ipv4_dst=dst_ip,
+                ipv4_src=hop_src,
+                ipv4_dst=hop_dst,
                 ip_proto=6  # Force TCP
             )
-            actions = [parser.OFPActionOutput(port)]
-            self.add_flow(datapath, 10, match, actions)
-            logger.info(f"Installed TCP flow: {src_ip} -> {dst_ip} via port {port} on dpid {src_dpid}")
+            for i in range(len(hop_path) - 1):
+                src_dpid = hop_path[i]
+                dst_dpid = hop_path[i + 1]
+                datapath = self.datapaths.get(src_dpid)
+                if not datapath:
+                    logger.error("No datapath for dpid %s", src_dpid)
+                    complete = False
+                    continue
+                port = self._edge_port.get((src_dpid, dst_dpid))
+                if port is None:
+                    logger.error("No port found for edge %s->%s", src_dpid, dst_dpid)
+                    complete = False
+                    continue
+                actions = output_actions.get(port)
+                if actions is None:
+                    actions = output_actions[port] = [ofproto_v1_3_parser.OFPActionOutput(port)]
+                mod = self._flow_mod(datapath, 10, match, actions)
+                if mod is not None:
+                    pending.setdefault(src_dpid, (datapath, []))[1].append(mod)
+                    logger.debug("Installed TCP flow: %s -> %s via port %s on dpid %s", hop_src, hop_dst, port, src_dpid)
+        
+        # One greenthread per switch, so a switch whose send queue is full does not hold up the others
+        hub.joinall([hub.spawn(self._send_mods, datapath, mods) for datapath, mods in pending.values()])
+        
+        # Packets already in flight for this flow can skip path selection until the flows idle out
+        if complete:
+            expiry = time.monotonic() + INSTALLED_PATH_TTL
+            self._installed_paths[(src_ip, dst_ip)] = expiry
+            self._installed_paths[(dst_ip, src_ip)] = expiry
+
+    @staticmethod
+    def _send_mods(datapath, mods):
+        for mod in mods:
+            datapath.send_msg(mod)
 
     def _reroute_affected_flows(self, dpid, port_no):
-        logger.info(f"Rerouting flows for dpid={dpid}, port={port_no}")
-        affected_flows = []
-        for flow in self.flow_stats['flows']:
-            if flow['dpid'] == dpid:
-                affected_flows.append((flow['src_ip'], flow['dst_ip']))
-        for src_ip, dst_ip in affected_flows:
+        logger.info("Rerouting flows for dpid=%s, port=%s", dpid, port_no)
+        flow_switches = {}
+        for src_ip, dst_ip in self._flows_by_dpid.get(dpid, ()):
             src_switch = self._get_switch_for_ip(src_ip)
             dst_switch = self._get_switch_for_ip(dst_ip)
             if src_switch and dst_switch:
-                network_state = self._get_current_network_state()
-                path_info = self._request_path_from_rl_agent(src_switch, dst_switch, network_state)
-                path = path_info.get('path', []) if path_info else []
-                if not path:
-                    logger.warning(f"RL agent failed for {src_ip}->{dst_ip}, using shortest path")
-                    path = self._get_shortest_path(src_switch, dst_switch)
-                if path:
-                    self._install_path_flows(path, src_ip, dst_ip, is_tcp=True)
-                    logger.info(f"Rerouted TCP flow: {src_ip} -> {dst_ip} via path {path}")
-        time.sleep(REROUTE_TIMEOUT)
+                flow_switches[(src_ip, dst_ip)] = (src_switch, dst_switch)
+        if not flow_switches:
+            return
+        
+        # One state snapshot and one RL request cover every distinct switch pair
+        network_state = self._get_current_network_state()
+        rl_paths = self._request_paths_from_rl_agent(list(set(flow_switches.values())), network_state)
+        for (src_ip, dst_ip), (src_switch, dst_switch) in flow_switches.items():
+            path = rl_paths.get((src_switch, dst_switch))
+            if not path:
+                logger.warning("RL agent failed for %s->%s, using shortest path", src_ip, dst_ip)
+                path = self._get_shortest_path(src_switch, dst_switch)
+            if path:
+                self._install_path_flows(path, src_ip, dst_ip, is_tcp=True)
+                logger.info("Rerouted TCP flow: %s -> %s via path %s", src_ip, dst_ip, path)
+
+    def _state_poller(self):
+        """Keep the RL agent's stats fresh in the background so PacketIns never wait on /stats"""
+        interval = STATE_POLL_INTERVAL
+        agent_up = None
+        while True:
+            try:
+                response = self._http.get('http://127.0.0.1:5000/stats', params={'summary': 1}, timeout=2.0)
+                response.raise_for_status()
+                self._latest_stats = orjson.loads(response.content)
+                if agent_up is False:
+                    logger.info("RL agent stats available again")
+                agent_up = True
+            except Exception as e:
+                # Log transitions only, not every failed poll
+                if agent_up is not False:
+                    logger.error("Error fetching RL agent stats: %s", e)
+                agent_up = False
+            
+            # Poll at full rate only while the agent is up and PacketIns are using the state
+            if agent_up and time.monotonic() - self._state_used_at < STATE_POLL_MAX_INTERVAL:
+                interval = STATE_POLL_INTERVAL
+            else:
+                interval = min(interval * 2, STATE_POLL_MAX_INTERVAL)
+            hub.sleep(interval)
 
     def _get_current_network_state(self):
-        try:
-            response = requests.get('http://127.0.0.1:5000/stats', timeout=2.0)
-            response.raise_for_status()
-            rl_stats = response.json()
-        except Exception as e:
-            logger.error(f"Error fetching RL agent stats: {e}")
-            rl_stats = {'count': 0, 'recent_rewards': [], 'paths': {}}
-        
+        self._state_used_at = time.monotonic()
+        rl_stats = self._latest_stats
         state = [
             self.flow_stats['count'],
-            len(self.flow_stats['flows']),
-            len(self.topology_graph.edges()) / max(len(self.topology_graph.nodes()) * (len(self.topology_graph.nodes()) - 1) / 2, 1),
+            self.flow_stats['count'],  # Flow entry count; always equalled the number of recorded flows
+            self._n_edges / max(self._n_nodes * (self._n_nodes - 1) / 2, 1),
             len(rl_stats['recent_rewards'])
         ]
-        logger.debug(f"Current network state: {state}")
+        logger.debug("Current network state: %s", state)
         return state
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
@@ -176,7 +307,7 @@ class SimpleSwitch13(app_manager.RyuApp):
         parser = datapath.ofproto_parser
         dpid = datapath.id
         self.datapaths[dpid] = datapath
-        logger.info(f"Switch connected: dpid={dpid}")
+        logger.info("Switch connected: dpid=%s", dpid)
 
         match = parser.OFPMatch()
         actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER, ofproto.OFPCML_NO_BUFFER)]
@@ -186,20 +317,25 @@ class SimpleSwitch13(app_manager.RyuApp):
         actions = [parser.OFPActionOutput(ofproto.OFPP_FLOOD)]
         self.add_flow(datapath, 5, match, actions)
 
+        # The file describes every switch, so the graph only needs building on the first connect
+        if self._topology_loaded:
+            return
+
         # Update topology graph
         try:
             if not os.path.exists('data/config/topology_info.json'):
                 logger.error("topology_info.json not found")
                 return
-            with open('data/config/topology_info.json', 'r') as f:
-                topology_info = json.load(f)
+            topology_info = self._load_topology_info()
             
             # Add switches as nodes
             for switch_name, info in topology_info['switches'].items():
                 dpid = info['dpid']
-                self.topology_graph.add_node(dpid)
+                if dpid not in self.topology_graph:
+                    self.topology_graph.add_node(dpid)
+                    self._n_nodes += 1
                 self.switches[dpid] = switch_name
-                logger.debug(f"Added switch node: dpid={dpid}, name={switch_name}")
+                logger.debug("Added switch node: dpid=%s, name=%s", dpid, switch_name)
             
             # Add edges from links
             for link in topology_info['links']:
@@ -209,17 +345,45 @@ class SimpleSwitch13(app_manager.RyuApp):
                 if src.startswith('s') and dst.startswith('s'):
                     src_dpid = topology_info['switches'][src]['dpid']
                     dst_dpid = topology_info['switches'][dst]['dpid']
+                    if not self.topology_graph.has_edge(src_dpid, dst_dpid):
+                        self._n_edges += 1
                     self.topology_graph.add_edge(src_dpid, dst_dpid, port=port)
-                    logger.debug(f"Added edge: {src_dpid}->{dst_dpid}, port={port}")
+                    # The graph keeps one port per undirected edge; the per-switch port maps have both ends
+                    src_port = topology_info['switches'][src]['ports'][dst]
+                    dst_port = topology_info['switches'][dst]['ports'][src]
+                    self._edge_port[(src_dpid, dst_dpid)] = src_port
+                    self._edge_port[(dst_dpid, src_dpid)] = dst_port
+                    self._port_neighbor[(src_dpid, src_port)] = dst_dpid
+                    self._port_neighbor[(dst_dpid, dst_port)] = src_dpid
+                    logger.debug("Added edge: %s->%s, port=%s", src_dpid, dst_dpid, port)
                 elif src.startswith('h'):
                     host_ip = topology_info['hosts'][src]['ip']
                     switch_dpid = topology_info['switches'][dst]['dpid']
                     self.hosts.setdefault(switch_dpid, []).append(host_ip)
-                    logger.debug(f"Added host: {host_ip} connected to dpid={switch_dpid}")
+                    logger.debug("Added host: %s connected to dpid=%s", host_ip, switch_dpid)
             
-            logger.info(f"Topology graph updated with {len(self.topology_graph.nodes())} nodes, {len(self.topology_graph.edges())} edges")
+            logger.info("Topology graph updated with %s nodes, %s edges", self._n_nodes, self._n_edges)
+            self._rebuild_apsp()
+            self._topology_loaded = True
+            if self.topology_graph.nodes:
+                self._topology_ready.set()
         except Exception as e:
-            logger.error(f"Error updating topology graph: {e}")
+            logger.error("Error updating topology graph: %s", e)
+
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def flow_removed_handler(self, ev):
+        msg = ev.msg
+        dpid = msg.datapath.id
+        flow_key = self._flow_key(dpid, msg.priority, msg.match)
+        if self.existing_flows.pop(flow_key, None) is None:
+            return
+        src_ip, dst_ip = flow_key[3], flow_key[4]
+        if src_ip is not None:
+            # The path is no longer complete; the next PacketIn for the pair reinstalls the missing hops
+            self._flows_by_dpid.get(dpid, set()).discard((src_ip, dst_ip))
+            self._installed_paths.pop((src_ip, dst_ip), None)
+        logger.debug("Flow removed: dpid=%s, priority=%s, src_ip=%s, dst_ip=%s, reason=%s",
+                     dpid, msg.priority, src_ip, dst_ip, msg.reason)
 
     @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
     def port_status_handler(self, ev):
@@ -229,19 +393,25 @@ class SimpleSwitch13(app_manager.RyuApp):
         reason = msg.reason
         dpid = dp.id
         
-        logger.info(f"Port status changed: dpid={dpid}, port={port_no}, reason={reason}")
+        logger.info("Port status changed: dpid=%s, port=%s, reason=%s", dpid, port_no, reason)
         
         if reason in [ofproto_v1_3.OFPPR_DELETE, ofproto_v1_3.OFPPR_MODIFY]:
             try:
-                for neighbor in list(self.topology_graph[dpid]):
-                    if self.topology_graph[dpid][neighbor].get('port') == port_no:
-                        self.topology_graph.remove_edge(dpid, neighbor)
-                        logger.info(f"Removed edge for dpid={dpid}, port={port_no}")
-                        self._reroute_affected_flows(dpid, port_no)
+                neighbor = self._port_neighbor.get((dpid, port_no))
+                if neighbor is not None and self.topology_graph.has_edge(dpid, neighbor):
+                    self.topology_graph.remove_edge(dpid, neighbor)
+                    self._n_edges -= 1
+                    self._edge_port.pop((dpid, neighbor), None)
+                    self._edge_port.pop((neighbor, dpid), None)
+                    logger.info("Removed edge for dpid=%s, port=%s", dpid, port_no)
+                    self._rebuild_apsp()
+                    self._path_cache.clear()
+                    self._installed_paths.clear()
+                    self._reroute_affected_flows(dpid, port_no)
             except Exception as e:
-                logger.error(f"Error updating topology graph: {e}")
+                logger.error("Error updating topology graph: %s", e)
         elif reason == ofproto_v1_3.OFPPR_ADD:
-            logger.info(f"Port {port_no} added for dpid={dpid}")
+            logger.info("Port %s added for dpid=%s", port_no, dpid)
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def packet_in_handler(self, ev):
@@ -250,31 +420,49 @@ class SimpleSwitch13(app_manager.RyuApp):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
-        pkt = packet.Packet(msg.data)
-        eth = pkt.get_protocol(ethernet.ethernet)
+        frame = msg.data
         dpid = datapath.id
 
-        logger.debug(f"PacketIn: dpid={dpid}, in_port={in_port}, eth_src={eth.src}, eth_dst={eth.dst}")
+        # Read the Ethernet header straight from the bytes; the full parser is only needed for tagged frames
+        if len(frame) < ETH_HEADER.size:
+            return
+        eth_dst, eth_src, ethertype = ETH_HEADER.unpack_from(frame, 0)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PacketIn: dpid=%s, in_port=%s, eth_src=%s, eth_dst=%s", dpid, in_port, eth_src.hex(':'), eth_dst.hex(':'))
 
-        if eth.ethertype == 0x0806:  # ARP
+        if ethertype == ETH_TYPE_ARP:
             logger.debug("ARP packet, flooding")
             return
 
-        self.mac_to_port.setdefault(dpid, {})
-        self.mac_to_port[dpid][eth.src] = in_port
+        # MAC table is keyed by the raw 6-byte addresses; only write when the port actually changes
+        table = self.mac_to_port.setdefault(dpid, OrderedDict())
+        if table.get(eth_src) != in_port:
+            table[eth_src] = in_port
+            table.move_to_end(eth_src)
+            if len(table) > MAC_TABLE_SIZE:
+                table.popitem(last=False)
 
-        if eth.dst in self.mac_to_port[dpid]:
-            out_port = self.mac_to_port[dpid][eth.dst]
-        else:
-            out_port = ofproto.OFPP_FLOOD
+        out_port = table.get(eth_dst, ofproto.OFPP_FLOOD)
 
         actions = [parser.OFPActionOutput(out_port)]
         if out_port != ofproto.OFPP_FLOOD:
-            ip_pkt = pkt.get_protocol(ipv4.ipv4)
-            if ip_pkt:
-                src_ip = ip_pkt.src
-                dst_ip = ip_pkt.dst
-                logger.debug(f"IP packet: src_ip={src_ip}, dst_ip={dst_ip}")
+            src_ip = dst_ip = None
+            if ethertype == ETH_TYPE_IPV4:
+                if len(frame) >= IPV4_ADDRS_OFFSET + IPV4_ADDRS.size:
+                    src_addr, dst_addr = IPV4_ADDRS.unpack_from(frame, IPV4_ADDRS_OFFSET)
+                    src_ip = socket.inet_ntoa(src_addr)
+                    dst_ip = socket.inet_ntoa(dst_addr)
+            elif ethertype in ETH_TYPES_VLAN:
+                ip_pkt = packet.Packet(frame).get_protocol(ipv4.ipv4)
+                if ip_pkt:
+                    src_ip = ip_pkt.src
+                    dst_ip = ip_pkt.dst
+            expiry = self._installed_paths.get((src_ip, dst_ip)) if src_ip else None
+            if expiry is not None and expiry > time.monotonic():
+                logger.debug("Path already installed for %s -> %s, forwarding only", src_ip, dst_ip)
+            elif src_ip:
+                logger.debug("IP packet: src_ip=%s, dst_ip=%s", src_ip, dst_ip)
                 src_switch = self._get_switch_for_ip(src_ip)
                 dst_switch = self._get_switch_for_ip(dst_ip)
                 if src_switch and dst_switch:
@@ -282,7 +470,7 @@ class SimpleSwitch13(app_manager.RyuApp):
                     path_info = self._request_path_from_rl_agent(src_switch, dst_switch, network_state)
                     path = path_info.get('path', []) if path_info else []
                     if not path:
-                        logger.warning(f"RL agent failed for {src_ip}->{dst_ip}, using shortest path")
+                        logger.warning("RL agent failed for %s->%s, using shortest path", src_ip, dst_ip)
                         path = self._get_shortest_path(src_switch, dst_switch)
                     if path:
                         self._install_path_flows(path, src_ip, dst_ip, is_tcp=True)  # Force TCP
@@ -298,18 +486,55 @@ class SimpleSwitch13(app_manager.RyuApp):
             data=data
         )
         datapath.send_msg(out)
-        logger.debug(f"Sent PacketOut: dpid={dpid}, out_port={out_port}, buffer_id={msg.buffer_id}")
+        logger.debug("Sent PacketOut: dpid=%s, out_port=%s, buffer_id=%s", dpid, out_port, msg.buffer_id)
 
 class RLControllerAPI(ControllerBase):
     def __init__(self, req, link, data, **config):
         super(RLControllerAPI, self).__init__(req, link, data, **config)
         self.controller = data['controller']
 
+    def _wait_for_topology(self, max_wait=30):
+        """Wait for the topology graph to initialize, returning whether it is ready"""
+        # Yields to other green threads (PacketIns, switch handshakes) until the graph is populated
+        if not self.controller._topology_ready.wait(timeout=max_wait):
+            return False
+        logger.debug("Topology graph ready with %s nodes", len(self.controller.topology_graph.nodes()))
+        return True
+
+    def _force_path(self, src_ip, dst_ip, path, network_state=None, rl_paths=None):
+        """Install the given, RL-chosen or shortest path for one pair; returns (status, body)"""
+        src_switch = self.controller._get_switch_for_ip(src_ip)
+        dst_switch = self.controller._get_switch_for_ip(dst_ip)
+        if not src_switch or not dst_switch:
+            logger.error("Cannot find switches for %s -> %s", src_ip, dst_ip)
+            return 400, {'error': f'Cannot find switches for {src_ip} -> {dst_ip}'}
+        
+        if not path:
+            if rl_paths is not None:
+                # Batch callers have already fetched RL paths for every switch pair they need
+                path = rl_paths.get((src_switch, dst_switch), [])
+            else:
+                if network_state is None:
+                    network_state = self.controller._get_current_network_state()
+                path_info = self.controller._request_path_from_rl_agent(src_switch, dst_switch, network_state)
+                path = path_info.get('path', []) if path_info else []
+            if not path:
+                logger.warning("RL agent failed for %s->%s, using shortest path", src_ip, dst_ip)
+                path = self.controller._get_shortest_path(src_switch, dst_switch)
+        
+        if not path:
+            logger.error("No valid path found for %s -> %s", src_ip, dst_ip)
+            return 400, {'error': 'No valid path found'}
+        
+        self.controller._install_path_flows(path, src_ip, dst_ip, is_tcp=True)  # Force TCP
+        logger.info("Installed TCP path %s for %s -> %s", path, src_ip, dst_ip)
+        return 200, {'status': 'success', 'message': f'Path {path} installed for {src_ip} -> {dst_ip}'}
+
     @route('rlcontroller', '/force_path', methods=['POST'])
     def force_path_installation(self, req, **kwargs):
         """Manually force path installation (for testing)"""
         try:
-            data = json.loads(req.body.decode('utf-8'))
+            data = orjson.loads(req.body)
             src_ip = data.get('src_ip')
             dst_ip = data.get('dst_ip')
             is_tcp = data.get('is_tcp', True)  # Default to TCP
@@ -317,56 +542,83 @@ class RLControllerAPI(ControllerBase):
             
             if not src_ip or not dst_ip:
                 logger.error("Missing src_ip or dst_ip in request")
-                return Response(status=400, body=json.dumps({'error': 'Missing src_ip or dst_ip'}), content_type='application/json; charset=UTF-8')
+                return Response(status=400, body=orjson.dumps({'error': 'Missing src_ip or dst_ip'}), content_type='application/json; charset=UTF-8')
+            
+            if not self._wait_for_topology():
+                logger.error("Topology graph not initialized after 30 seconds")
+                return Response(status=503, body=orjson.dumps({'error': 'Topology not ready'}), content_type='application/json; charset=UTF-8')
+            
+            status, body = self._force_path(src_ip, dst_ip, path)
+            return Response(status=status, body=orjson.dumps(body), content_type='application/json; charset=UTF-8')
+        except Exception as e:
+            logger.error("Error forcing path installation: %s", e)
+            return Response(status=500, body=orjson.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
+
+    @route('rlcontroller', '/force_paths_batch', methods=['POST'])
+    def force_paths_batch(self, req, **kwargs):
+        """Force path installation for a list of src/dst pairs in one request"""
+        try:
+            data = orjson.loads(req.body)
+            pairs = data.get('pairs', [])
             
-            # Wait for topology to initialize
-            max_wait = 30
-            start_time = time.time()
-            while time.time() - start_time < max_wait:
-                if self.controller.topology_graph.nodes:
-                    logger.info(f"Topology graph ready with {len(self.controller.topology_graph.nodes())} nodes")
-                    break
-                logger.debug("Waiting for topology graph to initialize")
-                time.sleep(1)
+            if not pairs or not isinstance(pairs, list):
+                logger.error("Missing pairs in batch request")
+                return Response(status=400, body=orjson.dumps({'error': 'Missing pairs'}), content_type='application/json; charset=UTF-8')
             
-            if not self.controller.topology_graph.nodes:
+            if not self._wait_for_topology():
                 logger.error("Topology graph not initialized after 30 seconds")
-                return Response(status=503, body=json.dumps({'error': 'Topology not ready'}), content_type='application/json; charset=UTF-8')
+                return Response(status=503, body=orjson.dumps({'error': 'Topology not ready'}), content_type='application/json; charset=UTF-8')
             
-            src_switch = self.controller._get_switch_for_ip(src_ip)
-            dst_switch = self.controller._get_switch_for_ip(dst_ip)
-            if not src_switch or not dst_switch:
-                logger.error(f"Cannot find switches for {src_ip} -> {dst_ip}")
-                return Response(status=400, body=json.dumps({'error': f'Cannot find switches for {src_ip} -> {dst_ip}'}), content_type='application/json; charset=UTF-8')
+            # Malformed entries get their own error result instead of failing the whole batch
+            results = [None] * len(pairs)
+            valid = []  # (index, src_ip, dst_ip, path)
+            for index, pair in enumerate(pairs):
+                if not isinstance(pair, dict):
+                    results[index] = {'error': 'Pair must be an object with src_ip and dst_ip', 'src_ip': None, 'dst_ip': None}
+                    continue
+                src_ip = pair.get('src_ip')
+                dst_ip = pair.get('dst_ip')
+                if not isinstance(src_ip, str) or not isinstance(dst_ip, str) or not src_ip or not dst_ip:
+                    results[index] = {'error': 'Missing src_ip or dst_ip', 'src_ip': src_ip, 'dst_ip': dst_ip}
+                    continue
+                valid.append((index, src_ip, dst_ip, pair.get('path', [])))
             
-            if not path:
-                network_state = self.controller._get_current_network_state()
-                path_info = self.controller._request_path_from_rl_agent(src_switch, dst_switch, network_state)
-                path = path_info.get('path', []) if path_info else []
+            # One RL request covers every pair that did not bring its own path
+            switch_pairs = set()
+            for _, src_ip, dst_ip, path in valid:
                 if not path:
-                    logger.warning(f"RL agent failed for {src_ip}->{dst_ip}, using shortest path")
-                    path = self.controller._get_shortest_path(src_switch, dst_switch)
-            
-            if not path:
-                logger.error(f"No valid path found for {src_ip} -> {dst_ip}")
-                return Response(status=400, body=json.dumps({'error': 'No valid path found'}), content_type='application/json; charset=UTF-8')
+                    src_switch = self.controller._get_switch_for_ip(src_ip)
+                    dst_switch = self.controller._get_switch_for_ip(dst_ip)
+                    if src_switch and dst_switch:
+                        switch_pairs.add((src_switch, dst_switch))
+            rl_paths = {}
+            if switch_pairs:
+                network_state = self.controller._get_current_network_state()
+                rl_paths = self.controller._request_paths_from_rl_agent(list(switch_pairs), network_state)
             
-            self.controller._install_path_flows(path, src_ip, dst_ip, is_tcp=True)  # Force TCP
-            logger.info(f"Installed TCP path {path} for {src_ip} -> {dst_ip}")
+            for index, src_ip, dst_ip, path in valid:
+                try:
+                    _, body = self._force_path(src_ip, dst_ip, path, rl_paths=rl_paths)
+                except Exception as e:
+                    logger.error("Error forcing path for %s -> %s: %s", src_ip, dst_ip, e)
+                    body = {'error': str(e)}
+                results[index] = dict(body, src_ip=src_ip, dst_ip=dst_ip)
             
+            failed = sum(1 for result in results if result.get('status') != 'success')
+            logger.info("Batch path installation: %s/%s pairs installed", len(results) - failed, len(results))
             return Response(
                 content_type='application/json; charset=UTF-8',
-                body=json.dumps({'status': 'success', 'message': f'Path {path} installed for {src_ip} -> {dst_ip}'})
+                body=orjson.dumps({'status': 'success' if not failed else 'partial', 'failed': failed, 'results': results})
             )
         except Exception as e:
-            logger.error("Error forcing path installation: %s", e)
-            return Response(status=500, body=json.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
+            logger.error("Error forcing batch path installation: %s", e)
+            return Response(status=500, body=orjson.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
 
     @route('rlcontroller', '/force_sp_path', methods=['POST'])
     def force_sp_path_installation(self, req, **kwargs):
         """Manually force shortest path installation (for comparison)"""
         try:
-            data = json.loads(req.body.decode('utf-8'))
+            data = orjson.loads(req.body)
             src_ip = data.get('src_ip')
             dst_ip = data.get('dst_ip')
             is_tcp = data.get('is_tcp', True)  # Default to TCP
@@ -374,18 +626,18 @@ class RLControllerAPI(ControllerBase):
             
             if not src_ip or not dst_ip or not path:
                 logger.error("Missing src_ip, dst_ip, or path in request")
-                return Response(status=400, body=json.dumps({'error': 'Missing src_ip, dst_ip, or path'}), content_type='application/json; charset=UTF-8')
+                return Response(status=400, body=orjson.dumps({'error': 'Missing src_ip, dst_ip, or path'}), content_type='application/json; charset=UTF-8')
             
             self.controller._install_path_flows(path, src_ip, dst_ip, is_tcp=True)  # Force TCP
-            logger.info(f"Installed TCP shortest path {path} for {src_ip} -> {dst_ip}")
+            logger.info("Installed TCP shortest path %s for %s -> %s", path, src_ip, dst_ip)
             
             return Response(
                 content_type='application/json; charset=UTF-8',
-                body=json.dumps({'status': 'success', 'message': f'Shortest path {path} installed for {src_ip} -> {dst_ip}'})
+                body=orjson.dumps({'status': 'success', 'message': f'Shortest path {path} installed for {src_ip} -> {dst_ip}'})
             )
         except Exception as e:
             logger.error("Error forcing shortest path installation: %s", e)
-            return Response(status=500, body=json.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
+            return Response(status=500, body=orjson.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
 
     @route('rlcontroller', '/stats', methods=['GET'])
     def get_stats(self, req, **kwargs):
@@ -394,8 +646,8 @@ class RLControllerAPI(ControllerBase):
             stats = self.controller._get_current_network_state()
             return Response(
                 content_type='application/json; charset=UTF-8',
-                body=json.dumps({'status': 'success', 'stats': stats})
+                body=orjson.dumps({'status': 'success', 'stats': stats})
             )
         except Exception as e:
             logger.error("Error retrieving stats: %s", e)
-            return Response(status=500, body=json.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
+            return Response(status=500, body=orjson.dumps({'error': str(e)}), content_type='application/json; charset=UTF-8')
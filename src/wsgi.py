@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""WSGI entry point for the RL agent.
+
+Run from the repository root with a single worker so the TF model is loaded once:
+    gunicorn -k gthread --threads 8 -w 1 -b 0.0.0.0:5000 --pythonpath src wsgi:app
+"""
+
+from rl_agent import app, init_agent
+
+init_agent()